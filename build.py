@@ -20,6 +20,7 @@ import optparse
 import os
 import re
 import shutil
+import signal
 import subprocess
 import traceback
 from io import BytesIO
@@ -188,23 +189,48 @@ def main(args):
     # off the command line
     test_names = []
 
-    while commands:
-        # ensure that each command starts with the CWD being the phoenix dir.
-        os.chdir(phoenixDir())
-        cmd = commands.pop(0)
-        if not cmd:
-            continue # ignore empty command-line args (possible with the buildbot)
-        elif cmd.startswith('test_'):
-            test_names.append('unittests/%s.py' % cmd)
-        elif cmd.startswith('unittests/test_'):
-            test_names.append(cmd)
-        elif 'cmd_'+cmd in globals():
-            function = globals()['cmd_'+cmd]
-            function(options, args)
-        else:
-            print('*** Unknown command: ' + cmd)
-            usage()
-            sys.exit(1)
+    # The wxWidgets build does not depend on the code generation commands, so
+    # if it is going to be run after them then start it in another process
+    # when the first of them is run, and wait for it before any of the
+    # commands that follow them.
+    wxBuild = None
+    optionArgs = [arg for arg in args if arg not in commands]
+    parallelWx = not options.no_parallel_wx and moveWxBuild(commands)
+
+    try:
+        while commands:
+            # ensure that each command starts with the CWD being the phoenix dir.
+            os.chdir(phoenixDir())
+            cmd = commands.pop(0)
+            if parallelWx and cmd in CODEGEN_COMMANDS:
+                wxBuild = startWxBuild(optionArgs)
+                parallelWx = False
+            elif wxBuild is not None and cmd not in CODEGEN_COMMANDS:
+                waitForWxBuild(wxBuild)
+                wxBuild = None
+
+            if not cmd:
+                continue # ignore empty command-line args (possible with the buildbot)
+            elif cmd.startswith('test_'):
+                test_names.append('unittests/%s.py' % cmd)
+            elif cmd.startswith('unittests/test_'):
+                test_names.append(cmd)
+            elif 'cmd_'+cmd in globals():
+                function = globals()['cmd_'+cmd]
+                function(options, args)
+            else:
+                print('*** Unknown command: ' + cmd)
+                usage()
+                sys.exit(1)
+
+        if wxBuild is not None:
+            waitForWxBuild(wxBuild)
+            wxBuild = None
+    finally:
+        # Don't leave the background build writing into the build tree if
+        # one of the commands failed or exited.
+        if wxBuild is not None:
+            stopWxBuild(wxBuild)
 
     # Now run the collected tests names, if any
     if test_names:
@@ -427,6 +453,7 @@ def makeOptionParser():
                                    "one in this source tree.  The wx-config in {prefix}/bin "
                                    "or the first found on the PATH determines which wx is "
                                    "used.  Implies --no_magic.")),
+        ("force_dox",      (False, "Run doxygen for the dox command even if its output is up to date")),
         ("force_config",   (False, "Run configure when building even if the script "
                                    "determines it's not necessary.")),
         ("no_config",      (False, "Turn off configure step on autoconf builds")),
@@ -464,6 +491,8 @@ def makeOptionParser():
         ("regenerate_sysconfig", (False, "Waf uses Python's sysconfig and related tools to configure the build. In some cases that info can be incorrect, so this option regenerates it. Must have write access to Python's lib folder.")),
         ("no_allmo",       (False, "Skip regenerating the wxWidgets message catalogs")),
         ("no_msedge",      (False, "Do not include the MS Edge backend for wx.html2.WebView. (Windows only)")),
+        ("no_pch",         (False, "Do not use precompiled headers for the wxWidgets build")),
+        ("no_parallel_wx", (False, "Do not run the wxWidgets build at the same time as the dox, etg and sip commands")),
         ("quiet",          (False, "Silence some of the messages from build.py"))
         ]
 
@@ -1022,6 +1051,16 @@ def _doDox(arg):
 
 def cmd_dox(options, args):
     cmdTimer = CommandTimer('dox')
+    cfg = Config(noWxConfig=True)
+
+    # Doxygen is slow, so only run it if the XML is missing or if any of the
+    # interface headers or the doxygen config is newer than its output.
+    deps = glob.glob(opj(wxDir(), 'interface', '**', '*.h'), recursive=True)
+    deps += glob.glob(opj(wxDir(), 'docs', 'doxygen', 'Doxyfile*'))
+    index = opj(cfg.DOXY_XML_DIR, 'index.xml')
+    if not options.force_dox and os.path.exists(index) and not newer_group(deps, index):
+        msg('Doxygen XML is up to date, skipping dox.')
+        return
     _doDox('xml')
 
 
@@ -1502,6 +1541,54 @@ def cmd_build(options, args):
     cmd_build_py(options, args)
 
 
+CODEGEN_COMMANDS = ['dox', 'etg', 'sip']
+
+def moveWxBuild(commands):
+    """
+    If the wxWidgets build is requested after any of the CODEGEN_COMMANDS
+    then take it out of the commands list, (a build command becomes just
+    build_py,) and return True so the caller can run it in parallel.
+    """
+    for name, replacement in [('build', 'build_py'), ('build_wx', None)]:
+        if name in commands:
+            idx = commands.index(name)
+            if not any(c in CODEGEN_COMMANDS for c in commands[:idx]):
+                return False
+            if replacement:
+                commands[idx] = replacement
+            else:
+                del commands[idx]
+            return True
+    return False
+
+
+def startWxBuild(optionArgs):
+    cmd = [sys.executable, '-u', 'build.py', 'build_wx',
+           '--python=%s' % PYTHON] + optionArgs
+    msg('Starting the wxWidgets build in the background: %s' % ' '.join(cmd))
+    # Give it its own process group so it can be stopped along with the
+    # make and compiler processes it starts.
+    return subprocess.Popen(cmd, cwd=phoenixDir(), start_new_session=not isWindows)
+
+
+def waitForWxBuild(wxBuild):
+    msg('Waiting for the background wxWidgets build to finish...')
+    rval = wxBuild.wait()
+    if rval:
+        msg('ERROR: The background wxWidgets build failed with exit code %d.' % rval)
+        sys.exit(rval)
+
+
+def stopWxBuild(wxBuild):
+    if wxBuild.poll() is None:
+        msg('Stopping the background wxWidgets build...')
+        if isWindows:
+            subprocess.call(['taskkill', '/F', '/T', '/PID', str(wxBuild.pid)])
+        else:
+            os.killpg(wxBuild.pid, signal.SIGTERM)
+        wxBuild.wait()
+
+
 
 def cmd_build_wx(options, args):
     cmdTimer = CommandTimer('build_wx')
@@ -1515,6 +1602,11 @@ def cmd_build_wx(options, args):
     if options.jobs:
         build_options.append('--jobs=%s' % options.jobs)
 
+    if options.no_pch:
+        # configure uses precompiled headers by default when the compiler
+        # supports them, so they have to be turned off explicitly.
+        build_options.append('--no_precomp_headers')
+
     if isWindows:
         # Windows-specific pre build stuff
         if not options.no_msedge:
@@ -1874,6 +1966,8 @@ def cmd_build_others(options, args):
     cmd = [PYTHON, 'setup-wxsvg.py', 'build_ext', '--inplace']
     if options.verbose:
         cmd.append('--verbose')
+    if options.jobs:
+        os.environ['PARALLEL_LEVEL'] = str(options.jobs)
     runcmd(cmd)
 
 
@@ -1893,6 +1987,9 @@ def cmd_clean_others(options, args):
     files = []
     for wc in ['*.pyd', '*.so']:
         files += sorted(glob.glob(opj(cfg.PKGDIR, 'svg', wc)))
+        # wx.lib and wx.py modules optionally compiled by setup-wxsvg.py
+        for pkg in ['lib', 'py']:
+            files += sorted(glob.glob(opj(cfg.PKGDIR, pkg, '**', wc), recursive=True))
     delFiles(files)
 
 
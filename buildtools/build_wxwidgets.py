@@ -213,6 +213,8 @@ def main(wxDir, args):
         "jom"           : (False, "Use jom.exe instead of nmake for MSW builds."),
         "no_dpi_aware"  : (False, "Don't use the DPI_AWARE_MANIFEST."),
         "no_msedge"     : (False, "Do not include the MS Edge backend for wx.html2.WebView. (Windows only)"),
+        "no_precomp_headers"
+                        : (False, "Don't use precompiled headers for autoconf builds. (MSVC builds always use them.)"),
     }
 
     parser = optparse.OptionParser(usage="usage: %prog [options]", version="%prog 1.0")
@@ -250,6 +252,9 @@ def main(wxDir, args):
         if options.debug:
             configure_opts.append("--enable-debug")
 
+        if options.no_precomp_headers:
+            configure_opts.append("--disable-precomp-headers")
+
         if options.osx_cocoa:
             configure_opts.append("--with-osx_cocoa")
         elif options.osx_carbon:
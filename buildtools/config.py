@@ -933,6 +933,25 @@ def runcmd(cmd, getOutput=False, echoCmd=True, fatal=True, onError=None):
         return output
 
 
+def runcmd_list(args, echoCmd=True, fatal=True, **kw):
+    """
+    Runs a command given as a list of arguments directly, without going
+    through a shell, so no quoting is needed. The command's stdout and stderr
+    are inherited so its output is still visible. Returns the exit code.
+    """
+    cmd = ' '.join(args)
+    if echoCmd:
+        msg(cmd)
+
+    rval = subprocess.run(args, env=os.environ, **kw).returncode
+    if rval:
+        # Failed!
+        print("Command '%s' failed with exit code %d." % (cmd, rval))
+        if fatal:
+            sys.exit(rval)
+    return rval
+
+
 def myExecfile(filename, ns):
     with open(filename, 'r') as f:
         exec(f.read(), ns)
@@ -1046,6 +1065,28 @@ def getSOName(filename):
     return None
 
 
+def getSONames(filenames):
+    """
+    Like getSOName, but runs objdump just once for all of the given files.
+    Returns a dictionary mapping each filename to its soname, or to None if
+    it doesn't have one.
+    """
+    sonames = dict.fromkeys(filenames)
+    if not filenames:
+        return sonames
+    output = runcmd(['objdump', '-p'] + list(filenames), True)
+    current = None
+    for line in output.splitlines():
+        result = re.match(r'^(.+):\s+file format ', line)
+        if result and result.group(1) in sonames:
+            current = result.group(1)
+            continue
+        result = re.match(r'^\s+SONAME\s+(.+)$', line)
+        if result and current is not None:
+            sonames[current] = result.group(1)
+    return sonames
+
+
 def getToolsPlatformName(useLinuxBits=False):
     name = sys.platform
     if name.startswith('linux'):
@@ -9,15 +9,13 @@
 # License:     wxWindows License
 #----------------------------------------------------------------------
 
-import sys
 import os
-import textwrap
+import glob
+import fnmatch
+import hashlib
+import shutil
 from setuptools import setup, Extension
-try:
-    from Cython.Build import cythonize
-    have_cython = True
-except ImportError:
-    have_cython = False
+from setuptools.command.build_ext import build_ext as orig_build_ext
 
 # Create a buildtools.config.Configuration object, to get the VERSION
 from buildtools.config import Config
@@ -32,12 +30,85 @@ PLATFORMS        = "WIN32,WIN64,OSX,POSIX"
 HERE = os.path.abspath(os.path.dirname(__file__))
 PACKAGE = 'wx.svg'
 PACKAGEDIR = 'wx/svg'
-BUILD_OPTIONS = { 'build_base' : 'build/wxsvg' }
 
-if have_cython:
-    SOURCE = os.path.join(PACKAGEDIR, '_nanosvg.pyx')
-else:
-    SOURCE = os.path.join(PACKAGEDIR, '_nanosvg.c')
+# Number of parallel jobs to use for both the Cython code generation (.pyx ->
+# .c) and the C compile (.c -> .so/.pyd) steps. build.py passes its --jobs
+# value via PARALLEL_LEVEL, otherwise use all the CPUs we can find.
+JOBS = int(os.environ.get('PARALLEL_LEVEL', os.cpu_count() or 1))
+
+BUILD_OPTIONS = { 'build_base' : 'build/wxsvg',
+                  'parallel'   : JOBS,
+                  }
+
+# Optionally compile the pure-Python wx.lib and wx.py packages with Cython
+# too. The .py files are left in place so everything still works as plain
+# Python when the extension modules are not present. This is opt-in for now,
+# set WXPYTHON_CYTHONIZE_LIB=1 in the environment to turn it on.
+CYTHONIZE_LIB = os.environ.get('WXPYTHON_CYTHONIZE_LIB', '0') == '1'
+CYTHONIZE_LIB_DIRS = ['wx/lib', 'wx/py']
+
+# Modules that should never be compiled. Package __init__ files are skipped so
+# the packages themselves stay importable from source, and the others rely on
+# introspecting Python code objects, frames or their own source files.
+CYTHONIZE_LIB_DENY = [
+    '*/__init__.py',
+    'wx/lib/pubsub/*',
+    'wx/lib/inspection.py',
+    'wx/lib/eventwatcher.py',
+    'wx/py/introspect.py',
+    'wx/py/interpreter.py',
+    'wx/py/sliceshell.py',
+    'wx/py/shell.py',
+    'wx/py/tests/*',
+    ]
+
+
+def getLibModules():
+    """
+    Returns the list of .py files in the CYTHONIZE_LIB_DIRS that are
+    candidates for being compiled with Cython.
+    """
+    sources = []
+    for dirname in CYTHONIZE_LIB_DIRS:
+        sources += glob.glob(os.path.join(dirname, '**', '*.py'), recursive=True)
+    sources = [name.replace(os.sep, '/') for name in sorted(sources)]
+    return [name for name in sources
+            if not any(fnmatch.fnmatch(name, pat) for pat in CYTHONIZE_LIB_DENY)]
+
+
+# These are also set in the header of the .pyx file, so the module compiles
+# the same way when cythonized outside of this script.
+CYTHON_DIRECTIVES = {'embedsignature': True,
+                     'language_level': 3,
+                     'boundscheck': False,
+                     'wraparound': False,
+                     }
+
+# Cython's code generation is a pure function of the .pyx/.pxd sources, the
+# Cython version and the compiler directives, so the generated C can be
+# cached across clean checkouts, (e.g. on CI where only the cache is
+# restored.) Set PHOENIX_CYTHON_CACHE=1 to turn it on.
+CYTHON_CACHE = os.environ.get('PHOENIX_CYTHON_CACHE', '0') == '1'
+CYTHON_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'phoenix-cython')
+
+
+def getCythonCacheFile(pyx, cythonVersion):
+    """
+    Returns the name of the file in the cache for the C code generated from
+    the given .pyx file, with the given Cython version and current directives.
+    """
+    sig = hashlib.sha256()
+    for filename in [pyx, os.path.splitext(pyx)[0] + '.pxd']:
+        if os.path.exists(filename):
+            with open(filename, 'rb') as fid:
+                sig.update(fid.read())
+    sig.update(cythonVersion.encode('utf-8'))
+    sig.update(repr(sorted(CYTHON_DIRECTIVES.items())).encode('utf-8'))
+    return os.path.join(CYTHON_CACHE_DIR, sig.hexdigest() + '.c')
+
+
+SOURCE = os.path.join(PACKAGEDIR, '_nanosvg.pyx')
+C_SOURCE = os.path.join(PACKAGEDIR, '_nanosvg.c')
 
 module = Extension(name='wx.svg._nanosvg',
                    sources=[SOURCE],
@@ -47,13 +118,55 @@ module = Extension(name='wx.svg._nanosvg',
                                   ('NANOSVG_ALL_COLOR_KEYWORDS', '1'),
                                   ])
 
-if have_cython:
-    modules = cythonize([module],
-                        compiler_directives={'embedsignature': True,
-                                             'language_level':2,
-                                            })
-else:
-    modules = [module]
+
+def cythonizeModules(modules):
+    """
+    Runs Cython on the given extension modules, (adding the wx.lib and wx.py
+    modules if CYTHONIZE_LIB is set,) and returns the extensions to build. If
+    Cython is not available then the previously generated C file is used.
+    """
+    try:
+        import Cython
+        from Cython.Build import cythonize
+    except ImportError:
+        for ext in modules:
+            ext.sources = [C_SOURCE if src == SOURCE else src for src in ext.sources]
+        return modules
+
+    if CYTHON_CACHE:
+        # On a cache hit copy the C file into place. It will be newer than
+        # the .pyx so cythonize will see it as up to date and skip it.
+        cacheFile = getCythonCacheFile(SOURCE, Cython.__version__)
+        if os.path.exists(cacheFile):
+            shutil.copyfile(cacheFile, C_SOURCE)
+
+    modules = cythonize(modules,
+                        nthreads=JOBS,
+                        compiler_directives=CYTHON_DIRECTIVES)
+
+    if CYTHON_CACHE and not os.path.exists(cacheFile):
+        os.makedirs(CYTHON_CACHE_DIR, exist_ok=True)
+        shutil.copyfile(C_SOURCE, cacheFile)
+
+    if CYTHONIZE_LIB:
+        # Keep the generated C files out of the source tree
+        modules += cythonize(getLibModules(),
+                             nthreads=JOBS,
+                             build_dir='build/wxsvg/cython',
+                             compiler_directives={'language_level': 3,
+                                                  'binding': True,
+                                                  })
+    return modules
+
+
+class wxsvg_build_ext(orig_build_ext):
+    """
+    Import Cython and generate the C code only when the extensions are
+    actually going to be built, so other commands don't have to pay for it.
+    """
+    def finalize_options(self):
+        self.distribution.ext_modules = cythonizeModules(self.distribution.ext_modules)
+        orig_build_ext.finalize_options(self)
 
 
 setup(name             = 'wx.svg',
@@ -62,6 +175,7 @@ setup(name             = 'wx.svg',
       long_description = LONG_DESCRIPTION,
       license          = LICENSE,
       #packages         = [PACKAGE],
-      ext_modules      = modules,
+      ext_modules      = [module],
       options          = { 'build' : BUILD_OPTIONS,  },
+      cmdclass         = { 'build_ext' : wxsvg_build_ext },
 )
@@ -10,24 +10,36 @@
 #----------------------------------------------------------------------
 
 import sys, os
-import glob
+import hashlib
+import pathlib
+import shutil
 import stat
 
-from setuptools                     import setup, find_packages
+from setuptools                     import setup
 from distutils.command.build        import build as orig_build
 from setuptools.command.install     import install as orig_install
 from setuptools.command.bdist_egg   import bdist_egg as orig_bdist_egg
 from setuptools.command.sdist       import sdist as orig_sdist
 from setuptools.command.bdist_wheel import bdist_wheel as orig_bdist_wheel
 
-# Alter the path so that buildtools can be imported from the current directory.
-sys.path.insert(0, os.path.dirname(__file__))
+# Load the buildtools package from this script's folder directly, rather than
+# adding the folder to the front of sys.path for the rest of the process.
+def _load_buildtools():
+    if 'buildtools' in sys.modules:
+        return
+    import importlib.util
+    pkgdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'buildtools')
+    spec = importlib.util.spec_from_file_location(
+        'buildtools', os.path.join(pkgdir, '__init__.py'),
+        submodule_search_locations=[pkgdir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['buildtools'] = module
+    spec.loader.exec_module(module)
 
-from buildtools.config import Config, msg, opj, runcmd, canGetSOName, getSOName
-import buildtools.version as version
+_load_buildtools()
+
+from buildtools.config import Config, msg, opj, runcmd_list, canGetSOName, getSONames
 
-# Create a buildtools.config.Configuration object
-cfg = Config(noWxConfig=True)
 DOCS_BASE='http://docs.wxPython.org'
 
 #----------------------------------------------------------------------
@@ -58,7 +70,7 @@ The utility tools wxdocs and wxdemo will download the appropriate files with wxg
 (if necessary), unpack them, (if necessary) and launch the appropriate version of
 the respective items. (Documents are launched in the default browser and demo is started
 with python).
-""".format(version=cfg.VERSION, docs_base=DOCS_BASE)
+"""
 
 
 with open('requirements/install.txt') as fid:
@@ -79,13 +91,27 @@ class wx_build(orig_build):
     """
     user_options = [
         ('skip-build', None, 'skip building the C/C++ code (assumes it has already been done)'),
+        ('ccache', None, 'wrap the C/C++ compilers with ccache (or sccache) if it is available'),
+        ('strip-libs', None, 'strip unneeded symbols from the wx shared libraries put in eggs and wheels'),
+        ('no-pch', None, 'do not use precompiled headers when building wxWidgets'),
         ]
-    boolean_options = ['skip-build']
+    boolean_options = ['skip-build', 'ccache', 'strip-libs', 'no-pch']
+
+    # These options are looked for on the whole command line, since they
+    # may be given to the bdist_* or install commands that run this one.
+    argv_options = ['skip-build', 'ccache', 'no-pch']
+
+    # Maps options of this command to the build.py option they turn on.
+    build_py_options = {
+        'no_pch' : '--no_pch',
+        }
 
 
     def initialize_options(self):
         orig_build.initialize_options(self)
-        self.skip_build = '--skip-build' in sys.argv
+        for opt in self.argv_options:
+            setattr(self, opt.replace('-', '_'), '--' + opt in sys.argv)
+        self.strip_libs = os.environ.get('PHOENIX_STRIP', '0') == '1'
 
     def finalize_options(self):
         orig_build.finalize_options(self)
@@ -100,15 +126,114 @@ class wx_build(orig_build):
                 '--skip-build with the bdist_* or install commands to avoid this \n'
                 'message and the wxWidgets and Phoenix build steps in the future.\n')
 
+            if self.ccache:
+                _use_compiler_cache()
+
             # Use the same Python that is running this script.
-            cmd = ['"{}"'.format(sys.executable), '-u', 'build.py', 'build']
-            cmd = ' '.join(cmd)
-            runcmd(cmd)
+            cmd = [sys.executable, '-u', 'build.py', 'build']
+            cmd += [flag for name, flag in self.build_py_options.items()
+                    if getattr(self, name)]
+            runcmd_list(cmd)
 
         # Let distutils handle building up the package folder under the
         # build/lib folder like normal.
         orig_build.run(self)
 
+        if not self.skip_build:
+            _write_build_stamp()
+
+
+# The bdist_* and install commands all need a build to pull from, but running
+# the build command again when nothing has changed is very expensive, since it
+# reenters build.py and the wxWidgets build. So we record a fingerprint of the
+# build inputs in a stamp file after a successful build, and those commands
+# only run the build again if the fingerprint no longer matches. The inputs
+# include the build scripts themselves and the environment variables they
+# read, so changing compilers or flags also forces a new build.
+BUILD_STAMP = opj('build', '.phoenix-build-stamp')
+BUILD_STAMP_DIRS = ['wx', 'etg', 'sip', 'src', 'buildtools',
+                    opj('ext', 'wxWidgets', 'include'),
+                    opj('ext', 'wxWidgets', 'src')]
+BUILD_STAMP_FILES = ['build.py', 'setup.py', 'wscript']
+BUILD_STAMP_ENV = ['CC', 'CXX', 'CFLAGS', 'CXXFLAGS', 'CPPFLAGS', 'LDFLAGS',
+                   'LDSHARED', 'CPU', 'WXWIN', 'WX_CONFIG', 'WXPYTHON_BUILD_ARGS',
+                   'WXPYTHON_RELEASE', 'PHOENIX_STRIP']
+
+
+def _build_signature():
+    # A cheap fingerprint of the build inputs: the name, size and mtime of
+    # every file in BUILD_STAMP_DIRS and BUILD_STAMP_FILES, the values of the
+    # BUILD_STAMP_ENV variables, plus the Python doing the build.
+    sig = hashlib.sha1(sys.version.encode('utf-8'))
+    def addFile(filename):
+        st = os.lstat(filename)
+        sig.update('{}:{}:{}\n'.format(
+            filename, st.st_size, st.st_mtime_ns).encode('utf-8'))
+
+    for dirname in BUILD_STAMP_DIRS:
+        for root, dirs, files in os.walk(dirname):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for name in sorted(files):
+                addFile(opj(root, name))
+    for filename in BUILD_STAMP_FILES:
+        if os.path.exists(filename):
+            addFile(filename)
+    for var in BUILD_STAMP_ENV:
+        sig.update('{}={!r}\n'.format(var, os.environ.get(var)).encode('utf-8'))
+    return sig.hexdigest()
+
+
+def _write_build_stamp():
+    os.makedirs(os.path.dirname(BUILD_STAMP), exist_ok=True)
+    with open(BUILD_STAMP, 'w') as fid:
+        fid.write(_build_signature())
+
+
+def _build_is_fresh(cmd):
+    # Returns True if a previous build is still up to date with its inputs.
+    build_lib = cmd.get_finalized_command('build').build_lib
+    if not os.path.isdir(build_lib) or not os.path.exists(BUILD_STAMP):
+        return False
+    with open(BUILD_STAMP) as fid:
+        stamp = fid.read().strip()
+    if stamp != _build_signature():
+        return False
+    msg('Build is up to date, skipping the build command.')
+    return True
+
+
+def _ensure_build(cmd):
+    # Run the build command unless the previous build is still fresh. The
+    # base classes' run() methods would run the build again themselves, so
+    # tell them to skip it, and mark it as done for any other command that
+    # asks for it.
+    if _build_is_fresh(cmd):
+        cmd.skip_build = True
+        cmd.distribution.have_run['build'] = 1
+    else:
+        cmd.run_command("build")
+
+
+def _use_compiler_cache():
+    # Wrap the C and C++ compilers with ccache, (or sccache if that is what is
+    # available,) via the CC and CXX environment variables so they will be
+    # inherited by build.py and the wxWidgets and waf builds it runs. Unchanged
+    # translation units are then served from the cache when rebuilding.
+    launcher = shutil.which('ccache') or shutil.which('sccache')
+    if launcher is None:
+        msg('WARNING: --ccache was given, but neither ccache nor sccache was found.')
+        return
+
+    for var, default in [('CC', 'cc'), ('CXX', 'c++')]:
+        compiler = os.environ.get(var, default)
+        if os.path.basename(compiler.split()[0]) in ('ccache', 'sccache'):
+            continue # already wrapped
+        os.environ[var] = '{} {}'.format(launcher, compiler)
+
+    # Compare compilers by content rather than mtime, so a reinstalled but
+    # otherwise identical compiler does not invalidate the whole cache.
+    os.environ.setdefault('CCACHE_COMPILERCHECK', 'content')
+
 
 def _cleanup_symlinks(cmd):
     # Clean out any libwx* symlinks in the build_lib folder, as they will
@@ -120,33 +245,74 @@ def _cleanup_symlinks(cmd):
     # TODO: can eggs have post-install scripts that would allow us to
     # restore the links? No.
     #
-    build_lib = cmd.get_finalized_command('build').build_lib
-    build_lib = opj(build_lib, 'wx')
-    for libname in sorted(glob.glob(opj(build_lib, 'libwx*'))):
-
-        if os.path.islink(libname):
-            if isDarwin:
-                # On Mac the name used by the extension module is the real
-                # file, so we can just get rid of all the links.
+    # Wheels can't help here either. The wheel format (PEP 427) is a plain
+    # zip archive with no way to record a symlink, and installers have no
+    # post-install hooks, so bdist_wheel would store a full copy of the
+    # library for every link. Installer options like uv's --link-mode=symlink
+    # only control how files get from the cache to site-packages, not what
+    # is inside the wheel. So wheels get the same treatment as eggs: one real
+    # file, named with the soname.
+    #
+    build_cmd = cmd.get_finalized_command('build')
+    build_lib = opj(build_cmd.build_lib, 'wx')
+    if not os.path.isdir(build_lib):
+        return
+
+    # Sort the libwx* files into symlinks, (along with their targets,) and
+    # real files with a single pass over the folder. The DirEntry objects
+    # already know if they are links, so there is no extra stat per file.
+    links = []
+    libs = []
+    with os.scandir(build_lib) as entries:
+        for entry in entries:
+            if not entry.name.startswith('libwx'):
+                continue
+            if entry.is_symlink():
+                links.append((entry.path, os.readlink(entry.path)))
+            else:
+                libs.append(entry.path)
+    links.sort()
+
+    if isDarwin:
+        # On Mac the name used by the extension module is the real
+        # file, so we can just get rid of all the links.
+        for libname, target in links:
+            os.unlink(libname)
+
+    elif canGetSOName():
+        # On linux the soname used in the extension modules may
+        # be (probably is) one of the symlinks, so we have to be
+        # more tricky here. If the named file is a link and it is
+        # the soname, then remove the link and rename the
+        # linked-to file to this name. The sonames are all fetched
+        # up front with a single objdump run.
+        sonames = getSONames([libname for libname, target in links])
+        for libname, target in links:
+            if sonames[libname] == os.path.basename(libname):
+                realfile = os.path.join(build_lib, target)
                 os.unlink(libname)
-
-            elif canGetSOName():
-                # On linux the soname used in the extension modules may
-                # be (probably is) one of the symlinks, so we have to be
-                # more tricky here. If the named file is a link and it is
-                # the soname, then remove the link and rename the
-                # linked-to file to this name.
-                soname = getSOName(libname)
-                if soname == os.path.basename(libname):
-                    realfile = os.path.join(build_lib, os.readlink(libname))
-                    os.unlink(libname)
-                    os.rename(realfile, libname)
-                else:
-                    os.unlink(libname)
+                os.rename(realfile, libname)
+                if realfile in libs:
+                    libs[libs.index(realfile)] = libname
             else:
-                # Otherwise just leave the symlink there since we don't
-                # know what to do with it.
-                pass
+                os.unlink(libname)
+
+    # Otherwise just leave the symlinks there since we don't
+    # know what to do with them.
+
+    if build_cmd.strip_libs:
+        _strip_libs(sorted(libs))
+
+
+def _strip_libs(libs):
+    # Strip the debug and other symbols not needed at runtime from the wx
+    # shared libraries, which greatly reduces the size of the egg or wheel.
+    # This is opt-in, (PHOENIX_STRIP=1 or build --strip-libs,) so builds
+    # meant to be debugged can keep their symbols.
+    if not libs or isWindows or shutil.which('strip') is None:
+        return
+    stripFlag = '-x' if isDarwin else '--strip-unneeded'
+    runcmd_list(['strip', stripFlag] + libs)
 
 
 class wx_bdist_egg(orig_bdist_egg):
@@ -168,7 +334,7 @@ class wx_bdist_egg(orig_bdist_egg):
 
     def run(self):
         # Ensure that there is a basic library build for bdist_egg to pull from.
-        self.run_command("build")
+        _ensure_build(self)
 
         _cleanup_symlinks(self)
 
@@ -191,7 +357,7 @@ class wx_bdist_wheel(orig_bdist_wheel):
 
     def run(self):
         # Ensure that there is a basic library build for bdist_egg/wheel to pull from.
-        self.run_command("build")
+        _ensure_build(self)
 
         _cleanup_symlinks(self)
 
@@ -205,7 +371,7 @@ class wx_install(orig_install):
         self.install_lib = self.install_platlib
 
     def run(self):
-        self.run_command("build")
+        _ensure_build(self)
         orig_install.run(self)
 
 
@@ -213,9 +379,8 @@ class wx_install(orig_install):
 class wx_sdist(orig_sdist):
     def run(self):
         # Use build.py to perform the sdist
-        cmd = ['"{}"'.format(sys.executable), '-u', 'build.py', 'sdist']
-        cmd = ' '.join(cmd)
-        runcmd(cmd)
+        cmd = [sys.executable, '-u', 'build.py', 'sdist']
+        runcmd_list(cmd)
 
         # Put the filename in dist_files in case the upload command is used.
         # On the other hand, PyPI's upload size limit is waaaaaaaaay too
@@ -289,7 +454,21 @@ setuptools.command.build_py.make_writable = wx_make_writable
 
 #----------------------------------------------------------------------
 
-WX_PKGLIST = [cfg.PKGDIR] + [cfg.PKGDIR + '.' + pkg for pkg in find_packages('wx')]
+def _find_packages(root):
+    # Equivalent to setuptools.find_packages(root), but with a single walk
+    # over the tree looking for __init__.py files. A folder is a package if it
+    # and all the folders between it and root have an __init__.py.
+    root = pathlib.Path(root)
+    found = {path.parent.relative_to(root).parts for path in root.rglob('__init__.py')}
+    found.discard(())
+    return ['.'.join(parts) for parts in sorted(found)
+            if not any('.' in part for part in parts)
+            and all(parts[:idx] in found for idx in range(1, len(parts)))]
+
+
+def _get_pkglist(pkgdir):
+    prefix = pkgdir + '.'
+    return [pkgdir, *(prefix + pkg for pkg in _find_packages(pkgdir))]
 
 HEADERS = None
 BUILD_OPTIONS = { } #'build_base' : cfg.BUILD_BASE }
@@ -301,8 +480,13 @@ BUILD_OPTIONS = { } #'build_base' : cfg.BUILD_BASE }
 
 
 if __name__ == '__main__':
+    # Create a buildtools.config.Configuration object. setup() needs the
+    # version for every command, so this is only kept out of the module
+    # level so that importing setup.py doesn't create it.
+    cfg = Config(noWxConfig=True)
     setup(version          = cfg.VERSION,
-          long_description = LONG_DESCRIPTION,
+          long_description = LONG_DESCRIPTION.format(version=cfg.VERSION,
+                                                     docs_base=DOCS_BASE),
           long_description_content_type = 'text/x-rst',
           license          = LICENSE,
           platforms        = PLATFORMS,
@@ -310,7 +494,7 @@ if __name__ == '__main__':
           zip_safe         = False,
           include_package_data = True,
 
-          packages         = WX_PKGLIST,
+          packages         = _get_pkglist(cfg.PKGDIR),
           ext_package      = cfg.PKGDIR,
 
           options          = { 'build'     : BUILD_OPTIONS },
@@ -1,5 +1,6 @@
 import unittest
 import sys
+import weakref
 from unittests import wtc
 import wx
 
@@ -38,6 +39,16 @@ class lib_agw_customtreectrl_Tests(wtc.WidgetTestCase):
         tree.SetItemData(root, None)
         self.assertTrue(tree.GetItemData(root) is None)
 
+    def test_lib_agw_customtreectrlTreeItemWeakref(self):
+        tree = CT.CustomTreeCtrl(self.frame)
+        root = tree.AddRoot('root item')
+        tree.SetItemTextColour(root, wx.RED)
+        # the items and their attributes use __slots__, but can still be
+        # weakly referenced
+        self.assertTrue(weakref.ref(root)() is root)
+        attr = root.Attr()
+        self.assertTrue(weakref.ref(attr)() is attr)
+
     def test_lib_agw_customtreectrlTreeItemPyData(self):
         # ensure that the "Py" versions works as the normal one
         value = 'Some Python Object'
@@ -65,6 +76,31 @@ class lib_agw_customtreectrl_Tests(wtc.WidgetTestCase):
         self.assertTrue(len(sel) == 2)
         self.assertTrue(isinstance(sel[0], CT.GenericTreeItem))
 
+    def test_lib_agw_customtreectrlGetFirstVisibleItem(self):
+        tree = CT.CustomTreeCtrl(self.frame, size=(200, 200),
+                                 agwStyle=CT.TR_DEFAULT_STYLE | CT.TR_HIDE_ROOT)
+        root = tree.AddRoot('root item')
+        c1 = tree.AppendItem(root, 'c1')
+        tree.AppendItem(c1, 'c1 child')
+        c2 = tree.AppendItem(root, 'c2')
+        tree.CalculatePositions()
+
+        self.assertTrue(tree.GetFirstVisibleItem() is c1)
+        # c1 is collapsed, so its child is skipped
+        self.assertTrue(tree.GetNextVisible(c1) is c2)
+
+    def test_lib_agw_customtreectrlFindItem(self):
+        tree = CT.CustomTreeCtrl(self.frame)
+        root = tree.AddRoot('root item')
+        tree.AppendItem(root, 'Apple')
+        item = tree.AppendItem(root, 'Banana')
+
+        self.assertTrue(tree.FindItem(root, 'b') is item)
+        # the search must follow the new label after a rename
+        tree.SetItemText(item, 'Cherry')
+        self.assertTrue(tree.FindItem(root, 'b') is None)
+        self.assertTrue(tree.FindItem(root, 'c') is item)
+
     def test_lib_agw_customtreectrlItemCheck(self):
 
         tree = CT.CustomTreeCtrl(self.frame)
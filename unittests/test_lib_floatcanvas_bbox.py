@@ -1,4 +1,5 @@
 import unittest
+import warnings
 from unittests import wtc
 import wx
 
@@ -173,6 +174,36 @@ class testIntersect(wtc.WidgetTestCase):
 
 
 
+class testOverlapsMany(wtc.WidgetTestCase):
+    B = BBox( ( (5, 10), (15, 25) ) )
+    BBarray = np.array( ( ((5, 10), (15, 25)),     # same
+                          ((0, 12), (10, 15)),     # left
+                          ((18, 0), (25, 5)),      # outside
+                          ((15, 25), (20, 30)),    # corner
+                          ((-np.inf, -np.inf), (np.inf, np.inf)),
+                          ((np.nan, np.nan), (np.nan, np.nan)),
+                        ),
+                        dtype=float)
+
+    def testMatchesOverlaps(self):
+        result = self.B.OverlapsMany(self.BBarray)
+        self.assertTrue( result.tolist() == [True, True, False, True, True, False] )
+        self.assertTrue( result.tolist() ==
+                         [self.B.Overlaps(BB) for BB in self.BBarray] )
+
+    def testInf(self):
+        result = InfBBox().OverlapsMany(self.BBarray)
+        self.assertTrue( result.all() )
+
+    def testNull(self):
+        result = NullBBox().OverlapsMany(self.BBarray)
+        self.assertTrue( result.tolist() == [False, False, False, False, True, False] )
+
+    def testEmpty(self):
+        result = self.B.OverlapsMany(np.zeros((0,2,2)))
+        self.assertTrue( result.shape == (0,) )
+
+
 class testEquality(wtc.WidgetTestCase):
     def testSame(self):
         B = BBox( ( (1.0, 2.0), (5.0, 10.0) ) )
@@ -454,6 +485,37 @@ class testBBarray(wtc.WidgetTestCase):
         BB = fromBBArray(self.BBarray)
         self.assertTrue(BB == self.BB, "Wrong BB was created. It was:\n%s \nit should have been:\n%s"%(BB, self.BB))
 
+class testBBoxIndex(wtc.WidgetTestCase):
+    rng = np.random.RandomState(42)
+    Mins = rng.uniform(-1000, 1000, (500, 2))
+    BBarray = np.stack( (Mins, Mins + rng.uniform(0, 50, (500, 2))), axis=1 )
+
+    def testQuery(self):
+        Index = BBoxIndex(self.BBarray, NodeSize=4)
+        for BB in ( BBox( ((-100, -100), (100, 100)) ),
+                    BBox( ((0, 0), (0, 0)) ),
+                    BBox( ((-2000, -2000), (-1500, -1500)) ),
+                    BBox( ((-2000, -2000), (2000, 2000)) ) ):
+            Expected = np.nonzero(BB.OverlapsMany(self.BBarray))[0]
+            self.assertTrue( Index.Query(BB).tolist() == Expected.tolist() )
+
+    def testNullInf(self):
+        BBarray = np.concatenate( (self.BBarray, [NullBBox(), InfBBox()]) )
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            Index = BBoxIndex(BBarray, NodeSize=4)
+        self.assertTrue( len(Index) == 502 )
+        self.assertTrue( Index.Query(NullBBox()).tolist() == [501] )
+        self.assertTrue( len(Index.Query(InfBBox())) == 502 )
+
+    def testEmpty(self):
+        Index = BBoxIndex(np.zeros((0,2,2)))
+        self.assertTrue( len(Index.Query(InfBBox())) == 0 )
+
+    def testNodeSize(self):
+        self.assertRaises(ValueError, BBoxIndex, self.BBarray, NodeSize=1)
+
+
 class testNullBBox(wtc.WidgetTestCase):
     B1 = NullBBox()
     B2 = NullBBox()
@@ -6,17 +6,20 @@ import wx
 
 class richmsgdlg_Tests(wtc.WidgetTestCase):
 
-    def test_richmsgdlg1(self):
-        dlg = wx.RichMessageDialog(None, 'Message', 'Caption')
-        wx.CallLater(250, dlg.EndModal, wx.ID_OK)
+    def runDialog(self, dlg):
+        # Use a short timer to end the modal loop, the native dialog may not
+        # be processing pending events yet when ShowModal starts.
+        wx.CallLater(10, dlg.EndModal, wx.ID_OK)
         dlg.ShowModal()
         dlg.Destroy()
 
+    def test_richmsgdlg1(self):
+        dlg = wx.RichMessageDialog(None, 'Message', 'Caption')
+        self.runDialog(dlg)
+
     def test_richmsgdlg2(self):
         dlg = wx.RichMessageDialog(self.frame, 'Message', 'Caption')
-        wx.CallLater(250, dlg.EndModal, wx.ID_OK)
-        dlg.ShowModal()
-        dlg.Destroy()
+        self.runDialog(dlg)
 
     def test_richmsgdlg3(self):
         dlg = wx.RichMessageDialog(None, 'Message', 'Caption')
@@ -35,9 +38,7 @@ class richmsgdlg_Tests(wtc.WidgetTestCase):
         self.assertEqual(dlg.CheckBoxText, "Checkbox")
         self.assertEqual(dlg.DetailedText, "Detailed Text")
 
-        wx.CallLater(250, dlg.EndModal, wx.ID_OK)
-        dlg.ShowModal()
-        dlg.Destroy()
+        self.runDialog(dlg)
 
 #---------------------------------------------------------------------------
 
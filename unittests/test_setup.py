@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+import importlib.util
+import os
+import shutil
+import tempfile
+
+from setuptools.dist import Distribution
+
+setupFilename = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'setup.py')
+
+def loadSetup():
+    spec = importlib.util.spec_from_file_location('phoenix_setup', setupFilename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+#---------------------------------------------------------------------------
+
+class setup_Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = loadSetup()
+        self.cwd = os.getcwd()
+        self.tmpdir = tempfile.mkdtemp()
+        os.chdir(self.tmpdir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def runBdistWheel(self):
+        dist = Distribution(dict(name='wxPython', cmdclass=self.setup.CMDCLASS))
+        cmd = self.setup.wx_bdist_wheel(dist)
+        with mock.patch.object(dist, 'run_command') as run_command, \
+             mock.patch.object(self.setup.orig_bdist_wheel, 'run'):
+            cmd.run()
+        return cmd, run_command
+
+
+    def test_setupBdistWheelFreshBuild(self):
+        # no stamp yet, so the build has to run
+        cmd, run_command = self.runBdistWheel()
+        run_command.assert_called_once_with('build')
+        self.assertFalse(cmd.skip_build)
+
+        os.makedirs(cmd.get_finalized_command('build').build_lib)
+        self.setup._write_build_stamp()
+
+        # the stamp is fresh, neither wx_bdist_wheel nor the base class
+        # should run the build again
+        cmd, run_command = self.runBdistWheel()
+        run_command.assert_not_called()
+        self.assertTrue(cmd.skip_build)
+        self.assertTrue(cmd.distribution.have_run.get('build'))
+
+
+    def test_setupBuildStampInputs(self):
+        dist = Distribution(dict(name='wxPython', cmdclass=self.setup.CMDCLASS))
+        cmd = self.setup.wx_bdist_wheel(dist)
+        os.makedirs(cmd.get_finalized_command('build').build_lib)
+        with open('build.py', 'w') as fid:
+            fid.write('# build script')
+        with mock.patch.dict(os.environ, {'CC': 'gcc'}):
+            self.setup._write_build_stamp()
+            self.assertTrue(self.setup._build_is_fresh(cmd))
+
+            # changing the compiler makes the build stale
+            with mock.patch.dict(os.environ, {'CC': 'clang'}):
+                self.assertFalse(self.setup._build_is_fresh(cmd))
+
+            # and so does changing the build scripts
+            with open('build.py', 'a') as fid:
+                fid.write('\n# changed')
+            self.assertFalse(self.setup._build_is_fresh(cmd))
+
+
+#---------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
@@ -401,6 +401,8 @@ Version 2.8
 # Version Info
 __version__ = "2.8"
 
+import sys
+
 import wx
 from wx.lib.expando import ExpandoTextCtrl
 
@@ -443,6 +445,11 @@ TreeItemIcon_Flagged = 3             # radio button,     selected
 TreeItemIcon_NotFlagged = 4          # radio button, not selected
 """ The item's radio button is not checked. """
 
+# The check/radio image indexes into CustomTreeCtrl._imageListCheck, indexed by
+# the constants above. Every item shares one of these instead of its own list.
+_CHECKED_IMAGES = (0, 1, 2, 3, 4)
+_NO_CHECKED_IMAGES = (None, None, None, None, None)
+
 # ----------------------------------------------------------------------------
 # CustomTreeCtrl flags
 # ----------------------------------------------------------------------------
@@ -686,6 +693,11 @@ def DrawTreeItemButton(win, dc, rect, flags):
 
 # ----------------------------------------------------------------------------
 
+# The (is_multiple, extended_select, unselect_others) tuples returned by
+# EventFlagsToSelType, indexed by (is_multiple << 2) | (shiftDown << 1) | ctrlDown
+_SEL_TYPE_TABLE = tuple((bool(m), bool(s and m), not ((s or c) and m))
+                        for m in (0, 1) for s in (0, 1) for c in (0, 1))
+
 def EventFlagsToSelType(style, shiftDown=False, ctrlDown=False):
     """
     Translate the key or mouse event flag to the type of selection we
@@ -704,11 +716,7 @@ def EventFlagsToSelType(style, shiftDown=False, ctrlDown=False):
        ``TR_MULTIPLE`` flag set, ``False`` otherwise.
     """
 
-    is_multiple = (style & TR_MULTIPLE) != 0
-    extended_select = shiftDown and is_multiple
-    unselect_others = not (extended_select or (ctrlDown and is_multiple))
-
-    return is_multiple, extended_select, unselect_others
+    return _SEL_TYPE_TABLE[(style & TR_MULTIPLE != 0) << 2 | bool(shiftDown) << 1 | bool(ctrlDown)]
 
 # ----------------------------------------------------------------------------
 
@@ -727,30 +735,40 @@ def ChopText(dc, text, max_size):
     .. versionadded:: 0.9.3
     """
 
-    # first check if the text fits with no problems (converts to Unicode).
-    x, y, dummy = dc.GetFullMultiLineTextExtent(text)
-
-    if x <= max_size:
-        return text
-
     # We cannot chop text that is UTF-8, as it could produce invalid sequences.
     if isinstance(text, bytes):
         # Convert UTF-8 (Phoenix's mandatory encoding) to Unicode.
         text = text.decode('utf-8')
-    textLen = len(text)
-    last_good_length = 0
 
-    for i in range(textLen, -1, -1):
-        s = text[0:i]
-        s += "..."
+    # first check if the text fits with no problems. Only multi-line text
+    # needs the (slower) line by line measurement.
+    if "\n" in text:
+        x, y, dummy = dc.GetFullMultiLineTextExtent(text)
+    else:
+        x, y = dc.GetTextExtent(text)
 
-        x, y = dc.GetTextExtent(s)
-        last_good_length = i
+    if x <= max_size:
+        return text
 
-        if x < max_size:
-            break
+    # Measure all the prefixes of the text at once: widths[i] is the width
+    # of text[0:i+1]. Bisect them for the longest prefix that fits with the
+    # ellipsis appended.
+    widths = dc.GetPartialTextExtents(text)
+    ellipsis_w, y = dc.GetTextExtent("...")
+    lo, hi = 0, len(widths)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if widths[mid] + ellipsis_w < max_size:
+            lo = mid + 1
+        else:
+            hi = mid
 
-    ret = text[0:last_good_length] + "..."
+    # Kerning across the join can make the whole string a bit wider than the
+    # sum of its parts, check the final string and back off if needed.
+    while lo > 0 and dc.GetTextExtent(text[0:lo] + "...")[0] >= max_size:
+        lo -= 1
+
+    ret = text[0:lo] + "..."
     return ret
 
 # ----------------------------------------------------------------------------
@@ -812,7 +830,7 @@ def BisectChildren(children, y):
     lo, hi, = 0, len(children)
     while lo < hi:
         mid = (lo + hi) // 2
-        if children[mid].GetY() < y:
+        if children[mid]._y < y:
             lo = mid + 1
         else:
             hi = mid
@@ -841,18 +859,18 @@ class DragImage(wx.DragImage):
         """
 
         text = item.GetText()
-        font = item.Attr().GetFont()
-        colour = item.Attr().GetTextColour()
+        attr = item.Attr()
+        font = attr.GetFont()
+        colour = attr.GetTextColour()
         if not colour:
             colour = wx.BLACK
         if not font:
             font = treeCtrl._normalFont
 
         backcolour = treeCtrl.GetBackgroundColour()
-        r, g, b = int(backcolour.Red()), int(backcolour.Green()), int(backcolour.Blue())
-        backcolour = ((r >> 1) + 20, (g >> 1) + 20, (b >> 1) + 20)
-        backcolour = wx.Colour(backcolour[0], backcolour[1], backcolour[2])
-        self._backgroundColour = backcolour
+        self._backgroundColour = wx.Colour((backcolour.Red() >> 1) + 20,
+                                           (backcolour.Green() >> 1) + 20,
+                                           (backcolour.Blue() >> 1) + 20)
 
         tempdc = wx.ClientDC(treeCtrl)
         tempdc.SetFont(font)
@@ -870,38 +888,36 @@ class DragImage(wx.DragImage):
         ycheckpos = 0
 
         if image != _NO_IMAGE:
-            if treeCtrl._imageListNormal:
-                image_w, image_h = treeCtrl._imageListNormal.GetSize(image)
+            imageList = treeCtrl._imageListNormal
+            if imageList:
+                image_w, image_h = imageList.GetSize(image)
                 image_w += 4
-                itemimage = treeCtrl._imageListNormal.GetBitmap(image)
+                itemimage = imageList.GetBitmap(image)
 
         checkimage = item.GetCurrentCheckedImage()
 
         if checkimage is not None:
-            if treeCtrl._imageListCheck:
-                wcheck, hcheck = treeCtrl._imageListCheck.GetSize(checkimage)
+            checkList = treeCtrl._imageListCheck
+            if checkList:
+                wcheck, hcheck = checkList.GetSize(checkimage)
                 wcheck += 4
-                itemcheck = treeCtrl._imageListCheck.GetBitmap(checkimage)
+                itemcheck = checkList.GetBitmap(checkimage)
 
-        total_h = max(hcheck, height)
-        total_h = max(image_h, total_h)
+        total_h = max(hcheck, height, image_h)
 
         if image_w:
             ximagepos = wcheck
-            yimagepos = ((total_h > image_h) and [(total_h - image_h) // 2] or [0])[0]
+            yimagepos = max(total_h - image_h, 0) // 2
 
         if checkimage is not None:
             xcheckpos = 2
-            ycheckpos = ((total_h > image_h) and [(total_h - image_h) // 2] or [0])[0] + 2
+            ycheckpos = max(total_h - image_h, 0) // 2 + 2
 
-        extraH = ((total_h > height) and [(total_h - height) // 2] or [0])[0]
+        extraH = max(total_h - height, 0) // 2
 
         xtextpos = wcheck + image_w
         ytextpos = extraH
 
-        total_h = max(image_h, hcheck)
-        total_h = max(total_h, height)
-
         if total_h < 30:
             total_h += 2                # at least 2 pixels
         else:
@@ -970,14 +986,25 @@ class DragImage(wx.DragImage):
         if wx.Platform != '__WXMAC__':
             timg = bitmap.ConvertToImage()
             if not timg.HasAlpha():
+                # Let wx turn every background pixel into a transparent one:
+                # InitAlpha() makes the mask colour pixels fully transparent.
+                backcolour = self._backgroundColour
+                timg.SetMaskColour(backcolour.Red(), backcolour.Green(), backcolour.Blue())
                 timg.InitAlpha()
-            for y in range(timg.GetHeight()):
-                for x in range(timg.GetWidth()):
-                    pix = wx.Colour(timg.GetRed(x, y),
-                                    timg.GetGreen(x, y),
-                                    timg.GetBlue(x, y))
-                    if pix == self._backgroundColour:
-                        timg.SetAlpha(x, y, 0)
+            else:
+                # Scan the RGB data for the background colour bytes and clear
+                # the alpha of the pixels where a match starts on a pixel boundary.
+                backcolour = self._backgroundColour
+                bg = bytes((backcolour.Red(), backcolour.Green(), backcolour.Blue()))
+                data = timg.GetData()
+                alpha = timg.GetAlphaBuffer()
+                pos = data.find(bg)
+                while pos != -1:
+                    if pos % 3 == 0:
+                        alpha[pos // 3] = 0
+                        pos = data.find(bg, pos + 3)
+                    else:
+                        pos = data.find(bg, pos + 1)
             bitmap = timg.ConvertToBitmap()
         return bitmap
 
@@ -993,6 +1020,8 @@ class TreeItemAttr(object):
     :note: This class is inspired by the wxWidgets generic implementation of :class:`TreeItemAttr`.
     """
 
+    __slots__ = ('_colText', '_colBack', '_colBorder', '_font', '__weakref__')
+
     def __init__(self, colText=wx.NullColour, colBack=wx.NullColour, colBorder=wx.NullColour, font=wx.NullFont):
         """
         Default class constructor.
@@ -1060,7 +1089,8 @@ class TreeItemAttr(object):
         :return: ``True`` if the text colour attribute has been set, ``False`` otherwise.
         """
 
-        return self._colText != wx.NullColour and self._colText.IsOk()
+        # The null colour is never Ok, no need to compare against it.
+        return self._colText.IsOk()
 
 
     def HasBackgroundColour(self):
@@ -1070,7 +1100,7 @@ class TreeItemAttr(object):
         :return: ``True`` if the background colour attribute has been set, ``False`` otherwise.
         """
 
-        return self._colBack != wx.NullColour and self._colBack.IsOk()
+        return self._colBack.IsOk()
 
 
     def HasBorderColour(self):
@@ -1082,7 +1112,7 @@ class TreeItemAttr(object):
         .. versionadded:: 0.9.6
         """
 
-        return self._colBorder != wx.NullColour and self._colBorder.IsOk()
+        return self._colBorder.IsOk()
 
 
     def HasFont(self):
@@ -1092,7 +1122,7 @@ class TreeItemAttr(object):
         :return: ``True`` if the font attribute has been set, ``False`` otherwise.
         """
 
-        return self._font != wx.NullFont and self._font.IsOk()
+        return self._font.IsOk()
 
 
     # getters
@@ -1152,6 +1182,10 @@ class CommandTreeEvent(wx.CommandEvent):
     :note: Not all the accessors make sense for all the events, see the event description for every method in this class.
     """
 
+    # Slots make the per-event attributes descriptors rather than dict entries,
+    # the wx base class still provides a __dict__ for anything else.
+    __slots__ = ('_item', '_evtKey', '_pointDrag', '_label', '_itemOld', '_editCancelled')
+
     def __init__(self, evtType, evtId, item=None, evtKey=None, point=None,
                  label=None, **kwargs):
         """
@@ -1171,6 +1205,8 @@ class CommandTreeEvent(wx.CommandEvent):
         self._evtKey = evtKey
         self._pointDrag = point
         self._label = label
+        self._itemOld = None
+        self._editCancelled = False
 
 
     def GetItem(self):
@@ -1355,6 +1391,9 @@ class TreeEvent(CommandTreeEvent):
 
     :note: Not all accessors make sense for all events, see the event descriptions below.
     """
+
+    __slots__ = ('_notify', '_notifyArgs')
+
     def __init__(self, evtType, evtId, item=None, evtKey=None, point=None,
                  label=None, **kwargs):
         """
@@ -1370,7 +1409,26 @@ class TreeEvent(CommandTreeEvent):
         """
 
         CommandTreeEvent.__init__(self, evtType, evtId, item, evtKey, point, label, **kwargs)
-        self.notify = wx.NotifyEvent(evtType, evtId)
+        # Most events are never vetoed, create the wx.NotifyEvent on demand.
+        self._notifyArgs = (evtType, evtId)
+        self._notify = None
+
+
+    def _GetNotify(self):
+        """ Returns the :class:`NotifyEvent`, creating it when first needed. """
+
+        if self._notify is None:
+            self._notify = wx.NotifyEvent(*self._notifyArgs)
+        return self._notify
+
+
+    def _SetNotify(self, notify):
+        """ Replaces the :class:`NotifyEvent`. """
+
+        self._notify = notify
+
+
+    notify = property(_GetNotify, _SetNotify)
 
 
     def GetNotifyEvent(self):
@@ -1389,7 +1447,8 @@ class TreeEvent(CommandTreeEvent):
         ``False`` otherwise (if it was).
         """
 
-        return self.notify.IsAllowed()
+        # An event that was never vetoed doesn't need its NotifyEvent.
+        return self._notify is None or self._notify.IsAllowed()
 
 
     def Veto(self):
@@ -1475,6 +1534,7 @@ class TreeTextCtrl(ExpandoTextCtrl):
         self._finished = False
         self._aboutToFinish = False
         self._currentValue = self._startValue
+        self._growTimer = None
 
         w = self._itemEdited.GetWidth()
         h = self._itemEdited.GetHeight()
@@ -1511,8 +1571,7 @@ class TreeTextCtrl(ExpandoTextCtrl):
 
         if wnd:
             h = max(hcheck, image_h)
-            dc = wx.ClientDC(self._owner)
-            h = max(h, dc.GetTextExtent("Aq")[1])
+            h = max(h, self._owner.GetCharHeight())
             h = h + 2
 
         # FIXME: what are all these hardcoded 4, 8 and 11s really?
@@ -1578,6 +1637,8 @@ class TreeTextCtrl(ExpandoTextCtrl):
 
         if not self._finished:
             self._finished = True
+            if self._growTimer:
+                self._growTimer.Stop()
             self._owner.SetFocusIgnoringChildren()
             self._owner.ResetEditControl()
 
@@ -1623,23 +1684,41 @@ class TreeTextCtrl(ExpandoTextCtrl):
 
         if not self._finished:
 
-            # auto-grow the textctrl:
-            parentSize = self._owner.GetSize()
-            myPos = self.GetPosition()
-            mySize = self.GetSize()
+            self._currentValue = self.GetValue()
+
+            # auto-grow the textctrl once the user pauses typing, there is
+            # no need to measure the text after every single key
+            if self._growTimer is None:
+                self._growTimer = wx.CallLater(50, self._AutoGrow)
+            else:
+                self._growTimer.Restart(50)
 
-            dc = wx.ClientDC(self)
-            sx, sy, dummy = dc.GetFullMultiLineTextExtent(self.GetValue() + "M")
+        event.Skip()
 
-            if myPos.x + sx > parentSize.x:
-                sx = parentSize.x - myPos.x
-            if mySize.x > sx:
-                sx = mySize.x
 
-            self.SetSize((sx, -1))
-            self._currentValue = self.GetValue()
+    def _AutoGrow(self):
+        """ Widens the control to fit its text, up to the edge of the tree. """
 
-        event.Skip()
+        if not self or self._finished:
+            return
+
+        parentSize = self._owner.GetSize()
+        myPos = self.GetPosition()
+        mySize = self.GetSize()
+
+        # wx.Window.GetTextExtent measures single lines without a DC of ours
+        text = self.GetValue() + "M"
+        if "\n" in text:
+            sx = max(self.GetTextExtent(line)[0] for line in text.split("\n"))
+        else:
+            sx = self.GetTextExtent(text)[0]
+
+        if myPos.x + sx > parentSize.x:
+            sx = parentSize.x - myPos.x
+        if mySize.x > sx:
+            sx = mySize.x
+
+        self.SetSize((sx, -1))
 
 
     def OnKillFocus(self, event):
@@ -1723,6 +1802,16 @@ class GenericTreeItem(object):
     :class:`CustomTreeCtrl`. This is a generic implementation of :class:`TreeItem`.
     """
 
+    # There can be a great many items in a tree, so do without the
+    # per-instance __dict__.
+    __slots__ = ('_text', '_textLower', '_extents', '_chopped', '_data', '_dirty', '_children',
+                 '_parent', '_attr', '_separator', '_images', '_leftimage',
+                 '_x', '_y', '_width', '_height', '_isCollapsed', '_hasHilight',
+                 '_hasPlus', '_isBold', '_isItalic', '_ownsAttr', '_type',
+                 '_is3State', '_checked', '_enabled', '_hypertext', '_visited',
+                 '_hidden', '_checkedimages', '_wnd', '_windowontheright',
+                 '_windowsize', '_windowenabled', '__weakref__')
+
     def __init__(self, parent, text="", ct_type=0, wnd=None, image=-1, selImage=-1, data=None, separator=False, on_the_right=True):
         """
         Default class constructor.
@@ -1780,8 +1869,12 @@ class GenericTreeItem(object):
         # since there can be very many of these, we save size by choosing
         # the smallest representation for the elements and by ordering
         # the members to avoid padding.
-        self._text = text       # label to be rendered for item
+        # label to be rendered for item, labels often repeat across a tree
+        # so equal ones share a single string
+        self._text = sys.intern(text) if type(text) is str else text
+        self._textLower = None  # The lowercased text, see CustomTreeCtrl.FindItem.
         self._extents = None    # The (width, height) of text in current font.
+        self._chopped = None    # The ellipsized text, see CustomTreeCtrl.PaintItem.
         self._data = data       # user-provided data
         self._dirty = True      # Flag indicates if CalculateSize required.
 
@@ -1822,8 +1915,8 @@ class GenericTreeItem(object):
         self._visited = False       # visited state for an hypertext item
         self._hidden = False        # hidden items are not painted
 
-        # Build checked images array
-        self._checkedimages = [None, None, None, None, None]
+        # Checked images, SetType() picks the right ones
+        self._checkedimages = _NO_CHECKED_IMAGES
         self.SetType(ct_type)
 
         if parent:
@@ -1831,7 +1924,7 @@ class GenericTreeItem(object):
                 # if the node parent is a radio not enabled, we are disabled
                 self._enabled = False
 
-        self._wnd = wnd                 		# are we holding a window?
+        self._wnd = None                		# are we holding a window? See SetWindow.
         self._windowontheright = on_the_right  	# on the right, or left?
         self._windowsize = None
         self._windowenabled = False
@@ -2165,7 +2258,25 @@ class GenericTreeItem(object):
         if self.IsSeparator() and wnd is not None:
             raise Exception("Separator items can not have an associated window")
 
-        self._wnd = wnd
+        # Only (re)bind the handlers when the window actually changes.
+        if wnd is not self._wnd:
+            if self._wnd:
+                self._wnd.Unbind(wx.EVT_SET_FOCUS, handler=self.OnSetFocus)
+                self._wnd.Unbind(wx.EVT_TREE_ITEM_COLLAPSING, handler=self.OnTreeItemCollapsing)
+
+            self._wnd = wnd
+
+            # We have to bind the wx.EVT_SET_FOCUS for the associated window
+            # No other solution to handle the focus changing from an item in
+            # CustomTreeCtrl and the window associated to an item
+            # Do better strategies exist?
+            self._wnd.Bind(wx.EVT_SET_FOCUS, self.OnSetFocus)
+
+            # We also have to bind the wx.EVT_TREE_ITEM_COLLAPSING for the
+            # associated window, for example when it is an agw.animate.AnimationCtrl,
+            # otherwise it would stay visible. See the demo for an example.
+            self._wnd.Bind(wx.EVT_TREE_ITEM_COLLAPSING, self.OnTreeItemCollapsing)
+
         self._windowontheright = bool(on_the_right)
 
         if wnd.GetSizer():      # the window is a complex one hold by a sizer
@@ -2173,17 +2284,6 @@ class GenericTreeItem(object):
         else:                   # simple window, without sizers
             size = wnd.GetSize()
 
-        # We have to bind the wx.EVT_SET_FOCUS for the associated window
-        # No other solution to handle the focus changing from an item in
-        # CustomTreeCtrl and the window associated to an item
-        # Do better strategies exist?
-        self._wnd.Bind(wx.EVT_SET_FOCUS, self.OnSetFocus)
-
-        # We also have to bind the wx.EVT_TREE_ITEM_COLLAPSING for the
-        # associated window, for example when it is an agw.animate.AnimationCtrl,
-        # otherwise it would stay visible. See the demo for an example.
-        self._wnd.Bind(wx.EVT_TREE_ITEM_COLLAPSING, self.OnTreeItemCollapsing)
-
         # We should not set these here? Set during CalculateSize().
         # self._height = size.GetHeight() + 2
         # self._width = size.GetWidth()
@@ -2289,7 +2389,16 @@ class GenericTreeItem(object):
         # Helio: This is not OK?
         #        Should it be more "internal" code?
         #        It is working on the user application.
-        for item in event.GetItem().GetChildren():
+        parent = event.GetItem()
+        children = parent.GetChildren()
+        # Only few items usually have a window, walk the tree's set of
+        # them rather than every child when that is shorter. The window may
+        # not be a direct child of the tree, so get it from the event.
+        withWindow = getattr(event.GetEventObject(), "_itemWithWindow", None)
+        if withWindow is not None and len(withWindow) < len(children):
+            children = [item for item in withWindow if item._parent is parent]
+
+        for item in children:
             itemwindow = item.GetWindow()
             if itemwindow:  # Hides the attached window if added
                 itemwindow.Hide()
@@ -2343,18 +2452,10 @@ class GenericTreeItem(object):
             self._dirty = True
             if self._type:
                 # Assign image indexes into tree's _imageListCheck.
-                self._checkedimages[TreeItemIcon_Checked] = 0
-                self._checkedimages[TreeItemIcon_NotChecked] = 1
-                self._checkedimages[TreeItemIcon_Undetermined] = 2
-                self._checkedimages[TreeItemIcon_Flagged] = 3
-                self._checkedimages[TreeItemIcon_NotFlagged] = 4
+                self._checkedimages = _CHECKED_IMAGES
             else:
-                # Set entire list to `None` to disable control images.
-                self._checkedimages[TreeItemIcon_Checked] = None
-                self._checkedimages[TreeItemIcon_NotChecked] = None
-                self._checkedimages[TreeItemIcon_Undetermined] = None
-                self._checkedimages[TreeItemIcon_Flagged] = None
-                self._checkedimages[TreeItemIcon_NotFlagged] = None
+                # All `None` to disable control images.
+                self._checkedimages = _NO_CHECKED_IMAGES
 
 
     def SetHyperText(self, hyper=True):
@@ -2478,7 +2579,7 @@ class GenericTreeItem(object):
         :return: ``True`` if the item has children, ``False`` otherwise.
         """
 
-        return len(self._children) > 0
+        return bool(self._children)
 
 
     def IsSelected(self):
@@ -2497,9 +2598,7 @@ class GenericTreeItem(object):
 
         :return: ``True`` if the item is expanded, ``False`` if it is collapsed.
         """
-        if self.IsHidden():
-            return False
-        return not self._isCollapsed
+        return not (self._isCollapsed or self._hidden)
 
 
     def GetValue(self):
@@ -2768,7 +2867,7 @@ class GenericTreeItem(object):
         if self.IsSeparator():
             raise Exception("Separator items can not have text")
         # Set text and clear extents so it gets recalculated.
-        self._text = text
+        self._text = sys.intern(text) if type(text) is str else text
         self._dirty = True
         self._extents = None
 
@@ -2870,7 +2969,7 @@ class GenericTreeItem(object):
         :return: A 2-tuple of (item, flags). The item may be ``None``.
         """
         # Hidden items are never evaluated.
-        if self.IsHidden():
+        if self._hidden:
             return None, flags
 
         # for a hidden root node, don't evaluate it, but do evaluate children
@@ -2944,7 +3043,7 @@ class GenericTreeItem(object):
                 return self, flags
 
             # if children are expanded, fall through to evaluate them
-            if not self.IsExpanded():
+            if self._isCollapsed:
                 # Item is not expanded (or hidden). Return no item found.
                 return None, 0
 
@@ -3129,6 +3228,12 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         self._freezeCount = 0
         self._freezeDC = None               # Used to speed up text metrics
 
+        self._lastClientWidth = -1          # Client width at the last OnSize.
+
+        # Damaged part of the client area in logical Y coordinates and the
+        # client height, computed once per OnPaint for PaintLevel.
+        self._paintStartY = self._paintLastY = self._paintHeight = 0
+
         self._findPrefix = ""               # Keyboard typed text search.
         self._findTimer = None              # Search expiry timer.
         self._findBellOnNoMatch = False     # wx.Bell() on no search match.
@@ -3216,6 +3321,9 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         # Set the separator pen default colour
         self._separatorPen = wx.Pen(wx.SystemSettings.GetColour(wx.SYS_COLOUR_GRAYTEXT))
 
+        # The pen used to draw the TR_ROW_LINES on a white background
+        self._rowLinesPen = wx.Pen(wx.Colour(200, 200, 200))
+
         # Create our container... at last!
         wx.ScrolledWindow.__init__(self, parent, id, pos, size, style | wx.HSCROLL | wx.VSCROLL, name)
 
@@ -3889,7 +3997,7 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         :param `item`: an instance of :class:`GenericTreeItem`.
         """
 
-        return len(item.GetChildren()) > 0
+        return bool(item._children)
 
 
     def GetChildrenCount(self, item, recursively=True):
@@ -5418,10 +5526,24 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         if not id:
             return id
 
+        # Skip the rows above the client area with a binary search down the
+        # expanded branches. Every item before the one found ends above it.
+        start_y = self.CalcUnscrolledPosition(0, 0)[1]
+        while id.IsExpanded() and not id.IsHidden():
+            children = id.GetChildren()
+            if not children:
+                break
+            child = children[BisectChildren(children, start_y)]
+            if child.GetY() > start_y or child.IsHidden():
+                break
+            id = child
+
+        # Only shown items can be visible, walk those from there.
+        cookie = None
         while id:
             if self.IsVisible(id):
                 return id
-            id = self.GetNext(id)
+            id, cookie = self.GetNextShownFast(id, cookie)
 
         return None
 
@@ -5437,9 +5559,11 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         """
 
         id = item
+        cookie = None
 
+        # Only shown items can be visible, skip the collapsed branches.
         while id:
-            id = self.GetNext(id)
+            id, cookie = self.GetNextShownFast(id, cookie)
             if id and self.IsVisible(id):
                 return id
 
@@ -5528,7 +5652,7 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             id, cookie = get_next(id, cookie)
 
         # look for the item starting with the given prefix after it
-        while id and not self.GetItemText(id).lower().startswith(prefix):
+        while id and not self._GetItemTextLower(id).startswith(prefix):
             id, cookie = get_next(id, cookie)
 
         # if we haven't found anything...
@@ -5543,15 +5667,33 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                     return id
 
             # and try all the items (stop when we get to the one we started from)
-            while id and id != idParent and not self.GetItemText(id).lower().startswith(prefix):
+            while id and id != idParent and not self._GetItemTextLower(id).startswith(prefix):
                 id, cookie = get_next(id, cookie)
 
         # Return item id, if it matches, otherwise return None.
-        if self.GetItemText(id).lower().startswith(prefix):
+        if self._GetItemTextLower(id).startswith(prefix):
             return id
         return None
 
 
+    def _GetItemTextLower(self, item):
+        """
+        Returns the lowercased item text, as used by :meth:`~CustomTreeCtrl.FindItem`.
+
+        The result is cached on the item for as long as :meth:`~CustomTreeCtrl.GetItemText`
+        keeps returning the same string, so typing a search prefix doesn't
+        lowercase every label again for each key.
+
+        :param `item`: an instance of :class:`GenericTreeItem`.
+        """
+
+        text = self.GetItemText(item)
+        cached = item._textLower
+        if cached is None or cached[0] is not text:
+            cached = item._textLower = (text, text.lower())
+        return cached[1]
+
+
     def EnableBellOnNoMatch(self, on=True):
         """Enable or disable a beep if no item matches the search.
 
@@ -7401,6 +7543,7 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         """
 
         attr = item.GetAttributes()
+        item_x, item_y = item._x, item._y
 
         if attr and attr.HasFont():
             dc.SetFont(attr.GetFont())
@@ -7476,7 +7619,7 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         if self.HasAGWFlag(TR_FULL_ROW_HIGHLIGHT):
             x = 0
 
-            itemrect = wx.Rect(x, item.GetY() + offset,
+            itemrect = wx.Rect(x, item_y + offset,
                                max(w, self._width - 1), total_h - offset)
 
             if item.IsSelected():
@@ -7498,8 +7641,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             else:
                 if drawItemBackground:
                     minusicon = wcheck + image_w - 2
-                    itemrect = wx.Rect(item.GetX() + minusicon,
-                                       item.GetY() + offset,
+                    itemrect = wx.Rect(item_x + minusicon,
+                                       item_y + offset,
                                        item.GetWidth() - minusicon,
                                        total_h - offset)
                     dc.DrawRectangle(itemrect)
@@ -7522,8 +7665,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                 else:
                     item_width = item.GetWidth() - image_w - wcheck + 2 - wndx
 
-                itemrect = wx.Rect(item.GetX() + wcheck + image_w - 2,
-                                   item.GetY() + offset,
+                itemrect = wx.Rect(item_x + wcheck + image_w - 2,
+                                   item_y + offset,
                                    item_width,
                                    total_h - offset)
 
@@ -7555,8 +7698,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                 else:
                     item_width = item.GetWidth() - minusicon
 
-                itemrect = wx.Rect(item.GetX() + minusicon,
-                                   item.GetY() + offset,
+                itemrect = wx.Rect(item_x + minusicon,
+                                   item_y + offset,
                                    item_width,
                                    total_h - offset)
 
@@ -7570,15 +7713,15 @@ class CustomTreeCtrl(wx.ScrolledWindow):
 
         if image != _NO_IMAGE:
 
-            dc.SetClippingRegion(item.GetX(), item.GetY(), wcheck + image_w - 2, total_h)
+            dc.SetClippingRegion(item_x, item_y, wcheck + image_w - 2, total_h)
             if item.IsEnabled():
                 imglist = self._imageListNormal
             else:
                 imglist = self._grayedImageList
 
             imglist.Draw(image, dc,
-                         item.GetX() + wcheck,
-                         item.GetY() + ((total_h > image_h) and [(total_h - image_h) // 2] or [0])[0],
+                         item_x + wcheck,
+                         item_y + max(total_h - image_h, 0) // 2,
                          wx.IMAGELIST_DRAW_TRANSPARENT)
 
             dc.DestroyClippingRegion()
@@ -7590,8 +7733,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                 imglist = self._grayedCheckList
 
             imglist.Draw(checkimage, dc,
-                         item.GetX(),
-                         item.GetY() + ((total_h > hcheck) and [(total_h - hcheck) // 2] or [0])[0],
+                         item_x,
+                         item_y + max(total_h - hcheck, 0) // 2,
                          wx.IMAGELIST_DRAW_TRANSPARENT)
 
         # Draw the left image for this item, if defined.
@@ -7606,19 +7749,29 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             # Center left image if smaller than total line height.
             l_image_w, l_image_h = imglist.GetSize(leftimage)
             y_offset = (total_h - l_image_h) // 2 if total_h > l_image_h else 0
-            imglist.Draw(leftimage, dc, 4, item.GetY() + y_offset,
+            imglist.Draw(leftimage, dc, 4, item_y + y_offset,
                          wx.IMAGELIST_DRAW_TRANSPARENT)
 
         dc.SetBackgroundMode(wx.TRANSPARENT)
-        extraH = ((total_h > text_h) and [(total_h - text_h) // 2] or [0])[0]
+        extraH = max(total_h - text_h, 0) // 2
 
-        textrect = wx.Rect(wcheck + image_w + item.GetX(), item.GetY() + extraH, text_w, text_h)
+        textrect = wx.Rect(wcheck + image_w + item_x, item_y + extraH, text_w, text_h)
 
         itemText = item.GetText()
         if self.HasAGWFlag(TR_ELLIPSIZE_LONG_ITEMS) and not separator:
-            xa, ya = self.CalcScrolledPosition((0, item.GetY()))
-            maxsize = w - (wcheck + image_w + item.GetX()) - xa
-            itemText = ChopText(dc, itemText, maxsize)
+            xa, ya = self.CalcScrolledPosition((0, item_y))
+            maxsize = w - (wcheck + image_w + item_x) - xa
+            # The cached extents tell if the text fits, only chop it if not.
+            if text_w > maxsize:
+                # Reuse the chopped text while the available width and the
+                # extents are unchanged. The extents are recalculated (a new
+                # tuple) whenever the item's text or font changes.
+                extents = item.GetExtents()
+                chopped = item._chopped
+                if chopped is None or chopped[0] is not extents or chopped[1] != maxsize:
+                    chopped = (extents, maxsize, ChopText(dc, itemText, maxsize))
+                    item._chopped = chopped
+                itemText = chopped[2]
 
         if not item.IsEnabled():
             foreground = dc.GetTextForeground()
@@ -7635,10 +7788,10 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         if wnd:
             if on_right:  # Helio: Original behaviour
                 # This +4 doesn't match the +2 in CalculateSize.
-                wndx = wcheck + image_w + item.GetX() + text_w + 4
+                wndx = wcheck + image_w + item_x + text_w + 4
             else:
-                wndx = wcheck + item.GetX()
-            xa, ya = self.CalcScrolledPosition((0, item.GetY()))
+                wndx = wcheck + item_x
+            xa, ya = self.CalcScrolledPosition((0, item_y))
             wndx += xa
             if item.GetHeight() > item.GetWindowSize()[1]:
                 ya += (item.GetHeight() - item.GetWindowSize()[1]) // 2
@@ -7646,7 +7799,7 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             if align == 1:
                 # Horizontal alignment of windows
                 if level in self.absoluteWindows:
-                    wndx = self.absoluteWindows[level] + item.GetX() + 2 + xa
+                    wndx = self.absoluteWindows[level] + item_x + 2 + xa
 
             elif align == 2:
                 # Rightmost alignment of windows
@@ -7675,8 +7828,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                 separatorPen = wx.GREY_PEN
 
             dc.SetPen(separatorPen)
-            dc.DrawLine(item.GetX() + 2, item.GetY() + total_h // 2,
-                        max(w, self._width - 1), item.GetY() + total_h // 2)
+            dc.DrawLine(item_x + 2, item_y + total_h // 2,
+                        max(w, self._width - 1), item_y + total_h // 2)
             dc.SetPen(oldPen)
 
         # restore normal font
@@ -7704,18 +7857,29 @@ class CustomTreeCtrl(wx.ScrolledWindow):
 
         """
         # Don't paint hidden items.
-        if item.IsHidden():
+        if item._hidden:
             return y
 
         # Get this item's X,Y position.
-        x = item.GetX() - self._spacing
-        y = item.GetY()
+        x = item._x - self._spacing
+        y = item._y
 
         if level == 0 and self.HasAGWFlag(TR_HIDE_ROOT):
             # Always expand hidden root.
-            children = item.GetChildren()
-            for child in children:
-                y = self.PaintLevel(child, dc, 1, y, align)
+            children = item._children
+            count = len(children)
+
+            # Paint only the top level items that are within the damaged part
+            # of the client area, the same way as for the children of an
+            # expanded item below.
+            start_y, last_y = self._paintStartY, self._paintLastY
+
+            n = BisectChildren(children, start_y)
+            while n < count:
+                y = self.PaintLevel(children[n], dc, 1, y, align)
+                n = n + 1
+                if y > last_y:
+                    break   # Early exit
 
             # Draw hidden root line if TR_LINES_AT_ROOT specified.
             if (len(children) > 1 and not self.HasAGWFlag(TR_NO_LINES) and
@@ -7777,10 +7941,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
 
                 # if the background colour is white, choose a
                 # contrasting colour for the lines
-                medium_grey = wx.Pen(wx.Colour(200, 200, 200))
-                dc.SetPen(((self.GetBackgroundColour() == wx.WHITE) and [medium_grey] or [wx.WHITE_PEN])[0])
-                dc.DrawLine(0, y_top, 10000, y_top)
-                dc.DrawLine(0, y, 10000, y)
+                dc.SetPen(self._rowLinesPen if self.GetBackgroundColour() == wx.WHITE else wx.WHITE_PEN)
+                dc.DrawLineList([(0, y_top, 10000, y_top), (0, y, 10000, y)])
 
             # restore DC objects
             dc.SetBrush(wx.WHITE_BRUSH)
@@ -7861,9 +8023,9 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                         self._drawingfunction(self, dc, wx.Rect(x - wImage // 2, y_mid - hImage // 2, wImage, hImage), flag)
 
         # If this item is expanded, handle its children.
-        if item.IsExpanded():
+        if not item._isCollapsed:
 
-            children = item.GetChildren()
+            children = item._children
             count = len(children)
 
             if count > 0:
@@ -7871,10 +8033,10 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                 n = 0
                 level = level + 1
 
-                # Calculate start and end of client area in logical Y coordinates.
-                width, height = self.GetClientSize()
-                start_y = self.CalcUnscrolledPosition(0, 0)[1]
-                last_y = self.CalcUnscrolledPosition(0, height)[1]
+                # Start and end of the damaged part of the client area, as
+                # computed by OnPaint. When only a few rows were refreshed
+                # there is no need to visit all the visible ones.
+                start_y, last_y = self._paintStartY, self._paintLastY
 
                 # If this item is off the bottom of the screen, do nothing.
                 if y_top > last_y:
@@ -7906,8 +8068,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                     # Move end points to the beginning/end of the view?
                     if y_mid < yOrigin:
                         y_mid = yOrigin
-                    if lastY > yOrigin + height:
-                        lastY = yOrigin + height
+                    if lastY > yOrigin + self._paintHeight:
+                        lastY = yOrigin + self._paintHeight
 
                     # after the adjustments if y_mid is larger than lastY
                     # then the line isn't visible at all so don't draw anything
@@ -7948,6 +8110,17 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         elif self.HasAGWFlag(TR_ALIGN_WINDOWS_RIGHT):
             align = 2
 
+        # Calculate start and end of the damaged part of the client area in
+        # logical Y coordinates once, instead of for every expanded item.
+        height = self.GetClientSize().height
+        top, bottom = 0, height
+        box = self.GetUpdateRegion().GetBox()
+        if box.height:
+            top, bottom = box.y, box.y + box.height
+        self._paintStartY = self.CalcUnscrolledPosition(0, top)[1]
+        self._paintLastY = self.CalcUnscrolledPosition(0, bottom)[1]
+        self._paintHeight = height
+
         y = 2
         self.PaintLevel(self._anchor, dc, 0, y, align)
 
@@ -7959,6 +8132,15 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         :param `event`: a :class:`wx.SizeEvent` event to be processed.
         """
 
+        # The ellipsized labels, full row highlights and right aligned windows
+        # only depend on the client width. When just the height changes the
+        # newly exposed rows are painted anyway, so there is nothing to do.
+        width = self.GetClientSize().width
+        if width == self._lastClientWidth:
+            event.Skip()
+            return
+        self._lastClientWidth = width
+
         if self.HasAGWFlag(TR_ELLIPSIZE_LONG_ITEMS):
             self.Refresh()
             event.Skip()
@@ -8502,7 +8684,7 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                     parent = self.GetItemParent(parent)
                 next = sibling
             item = next
-            if next and next.IsHidden() is False:
+            if next and not next._hidden:
                 # Found a valid non-hidden item. Break the loop.
                 item = None
         # Return the next item.
@@ -8800,9 +8982,15 @@ class CustomTreeCtrl(wx.ScrolledWindow):
                         maxsize = self.GetItemSize(hoverItem)
                         itemText = hoverItem.GetText()
 
-                        dc = wx.ClientDC(self)
+                        # Use the text extents cached by CalculateSize(),
+                        # they were measured with the item's own font.
+                        if hoverItem.HasExtents():
+                            text_w = hoverItem.GetExtents()[0]
+                        else:
+                            dc = wx.ClientDC(self)
+                            text_w = dc.GetFullMultiLineTextExtent(itemText)[0]
 
-                        if dc.GetFullMultiLineTextExtent(itemText)[0] > maxsize:
+                        if text_w > maxsize:
                             if tip != itemText:
                                 self.SetToolTip(itemText)
                         else:
@@ -8827,8 +9015,8 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             event.Skip()
             return
 
-        flags = 0
-        item, flags = self._anchor.HitTest(pt, self, flags, 0)
+        # The tree hasn't changed since the hit test above, reuse its result.
+        item = thisItem
 
         if event.Dragging() and not self._isDragging and ((flags & TREE_HITTEST_ONITEMICON) or (flags & TREE_HITTEST_ONITEMLABEL)):
 
@@ -9278,11 +9466,11 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             self.CalculateSize(item, dc, level, align)
 
         # Set its position
-        item.SetX(x)
-        item.SetY(y)
+        item._x = x
+        item._y = y
 
         # hidden items don't get a height (height=0).
-        if item.IsHidden():
+        if item._hidden:
             return y
         item_height = self.GetLineHeight(item)
         item_width = item.GetWidth()
@@ -9310,12 +9498,12 @@ class CustomTreeCtrl(wx.ScrolledWindow):
         if not item.IsSeparator():
             self._width = max(self._width, x + item_width)
 
-        if not item.IsExpanded():
+        if item._isCollapsed:
             # we don't need to calculate collapsed branches
             return y
 
         # Recurse
-        for child in item.GetChildren():
+        for child in item._children:
             y = self.CalculateLevel(child, dc, level + 1, x_colstart, y, align)
         return y
 
@@ -9538,7 +9726,10 @@ class CustomTreeCtrl(wx.ScrolledWindow):
             # Tree is now fully unfrozen.
             self._freezeDC = None
             if self._dirty is True:
+                # Changes made while frozen were not painted, repaint them
+                # all at once now.
                 self.CalculatePositions()
+                self.Refresh()
 
 
 
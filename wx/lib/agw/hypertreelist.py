@@ -2328,6 +2328,7 @@ class TreeListMainWindow(CustomTreeCtrl):
         """
 
         self._buffered = False
+        self._paintBuffer = None
 
         CustomTreeCtrl.__init__(self, parent, id, pos, size, style, agwStyle, validator, name)
 
@@ -2384,6 +2385,32 @@ class TreeListMainWindow(CustomTreeCtrl):
             self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
         else:
             self.SetBackgroundStyle(wx.BG_STYLE_ERASE)
+            self._paintBuffer = None
+
+
+    def GetPaintBuffer(self):
+        """
+        Returns the bitmap used as the double-buffering back buffer.
+
+        The same bitmap is reused for every paint event and is only recreated
+        when the window has grown bigger than it, instead of allocating a new
+        one the size of the window each time.
+
+        :return: An instance of :class:`wx.Bitmap`, or ``wx.NullBitmap`` to let
+         :class:`wx.BufferedPaintDC` create a buffer scaled for a HiDPI display.
+        """
+
+        if self.GetContentScaleFactor() != 1.0:
+            return wx.NullBitmap
+
+        width, height = self.GetClientSize()
+        buffer = self._paintBuffer
+
+        if buffer is None or buffer.GetWidth() < width or buffer.GetHeight() < height:
+            buffer = wx.Bitmap(max(width, 1), max(height, 1))
+            self._paintBuffer = buffer
+
+        return buffer
 
 
     def IsVirtual(self):
@@ -3660,7 +3687,7 @@ class TreeListMainWindow(CustomTreeCtrl):
         if self._buffered:
 
             # paint the background
-            dc = wx.BufferedPaintDC(self)
+            dc = wx.BufferedPaintDC(self, self.GetPaintBuffer())
             rect = self.GetUpdateRegion().GetBox()
             dc.SetClippingRegion(rect)
             dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
@@ -2767,7 +2767,7 @@ class Group(DrawObject):
     def CalcBoundingBox(self):
         """Calculate the bounding box."""
         if self.ObjectList:
-            BB = BBox.BBox(self.ObjectList[0].BoundingBox).copy()
+            BB = BBox.BBox(self.ObjectList[0].BoundingBox)
             for obj in self.ObjectList[1:]:
                 BB.Merge(obj.BoundingBox)
         else:
@@ -15,8 +15,27 @@ A Bounding Box object and assorted utilities , subclassed from a numpy array
 
 """
 
+import math
 import numpy as np
 
+def _corners(BB):
+    """
+    Returns the corners of a bounding box as Python floats:
+    (MinX, MinY, MaxX, MaxY)
+
+    Pulling them all out in one call is much cheaper than indexing the
+    array four times, which creates a numpy scalar for each entry.
+
+    This is only needed for the other operand of the BBox methods: self is
+    always a 2x2 BBox, so they unpack self.tolist() directly.
+    """
+    try:
+        (MinX, MinY), (MaxX, MaxY) = BB.tolist()
+    except (AttributeError, TypeError, ValueError):
+        # not a 2x2 array
+        (MinX, MinY), (MaxX, MaxY) = np.asarray(BB, float).reshape(2,2).tolist()
+    return MinX, MinY, MaxX, MaxY
+
 class BBox(np.ndarray):
     """
     A Bounding Box object:
@@ -63,7 +82,8 @@ class BBox(np.ndarray):
         """
         arr = np.array(data, float)
         arr.shape = (2,2)
-        if arr[0,0] > arr[1,0] or arr[0,1] > arr[1,1]:
+        (MinX, MinY), (MaxX, MaxY) = arr.tolist()
+        if MinX > MaxX or MinY > MaxY:
             # note: zero sized BB OK.
             raise ValueError("BBox values not aligned: \n minimum values must be less that maximum values")
         return np.ndarray.__new__(subtype, shape=arr.shape, dtype=arr.dtype, buffer=arr)
@@ -77,14 +97,41 @@ class BBox(np.ndarray):
         If they are just touching, returns True
         """
 
-        if np.isinf(self).all() or np.isinf(BB).all():
+        (MinX, MinY), (MaxX, MaxY) = self.tolist()
+        BBMinX, BBMinY, BBMaxX, BBMaxY = _corners(BB)
+        if ( (MaxX >= BBMinX) and (MinX <= BBMaxX) and
+             (MaxY >= BBMinY) and (MinY <= BBMaxY) ):
             return True
-        if ( (self[1,0] >= BB[0,0]) and (self[0,0] <= BB[1,0]) and
-             (self[1,1] >= BB[0,1]) and (self[0,1] <= BB[1,1]) ):
+        # An InfBBox overlaps everything, even a NullBBox, whose NaNs make
+        # all the comparisons above fail.
+        if ( all(map(math.isinf, (MinX, MinY, MaxX, MaxY))) or
+             all(map(math.isinf, (BBMinX, BBMinY, BBMaxX, BBMaxY))) ):
             return True
         else:
             return False
 
+    def OverlapsMany(self, BBarray):
+        """
+        OverlapsMany(BBarray):
+
+        Tests which of an array of Bounding Boxes overlap with this one.
+
+        The BBarray is in the shape: (Nx2x2), as for fromBBArray. Returns a
+        boolean array of length N, that is True where BBarray[n] overlaps
+        with this one. This does the same tests as Overlaps, but for all N
+        at once, so it is much faster than calling Overlaps in a loop.
+        """
+        (MinX, MinY), (MaxX, MaxY) = self.tolist()
+        BBMinX, BBMinY, BBMaxX, BBMaxY = np.asarray(BBarray, float).reshape(-1,4).T
+        if all(map(math.isinf, (MinX, MinY, MaxX, MaxY))):
+            return np.ones(BBMinX.shape, bool)
+        result = ( (MaxX >= BBMinX) & (MinX <= BBMaxX) &
+                   (MaxY >= BBMinY) & (MinY <= BBMaxY) )
+        # InfBBoxes overlap everything, even a NullBBox
+        result |= ( np.isinf(BBMinX) & np.isinf(BBMinY) &
+                    np.isinf(BBMaxX) & np.isinf(BBMaxY) )
+        return result
+
     def Inside(self, BB):
         """
         Inside(BB):
@@ -96,8 +143,10 @@ class BBox(np.ndarray):
 
         Returns False otherwise
         """
-        if ( (BB[0,0] >= self[0,0]) and (BB[1,0] <= self[1,0]) and
-             (BB[0,1] >= self[0,1]) and (BB[1,1] <= self[1,1]) ):
+        (MinX, MinY), (MaxX, MaxY) = self.tolist()
+        BBMinX, BBMinY, BBMaxX, BBMaxY = _corners(BB)
+        if ( (BBMinX >= MinX) and (BBMaxX <= MaxX) and
+             (BBMinY >= MinY) and (BBMaxY <= MaxY) ):
             return True
         else:
             return False
@@ -115,10 +164,9 @@ class BBox(np.ndarray):
 
         Point is any length-2 sequence (tuple, list, array) or two numbers
         """
-        if Point[0] >= self[0,0] and \
-               Point[0] <= self[1,0] and \
-               Point[1] <= self[1,1] and \
-               Point[1] >= self[0,1]:
+        (MinX, MinY), (MaxX, MaxY) = self.tolist()
+        x, y = Point[0], Point[1]
+        if MinX <= x <= MaxX and MinY <= y <= MaxY:
             return True
         else:
             return False
@@ -128,20 +176,24 @@ class BBox(np.ndarray):
         Joins this bounding box with the one passed in, maybe making this one bigger
 
         """
-        if self.IsNull():
+        (MinX, MinY), (MaxX, MaxY) = self.tolist()
+        BBMinX, BBMinY, BBMaxX, BBMaxY = _corners(BB)
+        if all(map(math.isnan, (MinX, MinY, MaxX, MaxY))):
             self[:] = BB
-        elif np.isnan(BB).all(): ## BB may be a regular array, so I can't use IsNull
+        elif all(map(math.isnan, (BBMinX, BBMinY, BBMaxX, BBMaxY))): ## BB may be a regular array, so I can't use IsNull
             pass
         else:
-            if BB[0,0] < self[0,0]: self[0,0] = BB[0,0]
-            if BB[0,1] < self[0,1]: self[0,1] = BB[0,1]
-            if BB[1,0] > self[1,0]: self[1,0] = BB[1,0]
-            if BB[1,1] > self[1,1]: self[1,1] = BB[1,1]
+            if BBMinX < MinX: self[0,0] = BBMinX
+            if BBMinY < MinY: self[0,1] = BBMinY
+            if BBMaxX > MaxX: self[1,0] = BBMaxX
+            if BBMaxY > MaxY: self[1,1] = BBMaxY
 
         return None
 
     def IsNull(self):
-        return np.isnan(self).all()
+        # all() stops at the first entry that isn't NaN, so for a normal
+        # bounding box this is a single isnan test on a Python float.
+        return all(map(math.isnan, self.ravel().tolist()))
 
     ## fixme: it would be nice to add setter, too.
     def _getLeft(self):
@@ -166,7 +218,8 @@ class BBox(np.ndarray):
     Height = property(_getHeight)
 
     def _getCenter(self):
-        return self.sum(0) / 2.0
+        (MinX, MinY), (MaxX, MaxY) = self.tolist()
+        return np.array(((MinX + MaxX) / 2.0, (MinY + MaxY) / 2.0))
     Center = property(_getCenter)
     ### This could be used for a make BB from a bunch of BBs
 
@@ -187,6 +240,15 @@ class BBox(np.ndarray):
         A == B if and only if all the entries are the same
 
         """
+        if isinstance(BB, np.ndarray) and BB.shape == self.shape == (2,2):
+            ## Comparing as Python floats is much cheaper than the elementwise
+            ## compare plus the reductions below.
+            Corners = self.tolist()
+            BBCorners = BB.tolist()
+            if Corners == BBCorners:
+                return True
+            return ( all(map(math.isnan, Corners[0] + Corners[1])) and
+                     all(map(math.isnan, BBCorners[0] + BBCorners[1])) )
         if self.IsNull() and np.isnan(BB).all(): ## BB may be a regular array, so I can't use IsNull
             return True
         else:
@@ -210,7 +272,9 @@ def asBBox(data):
 
     """
 
-    if isinstance(data, BBox):
+    # check the exact type first, it's much cheaper than isinstance and
+    # FloatCanvas passes BBoxes through here all the time.
+    if type(data) is BBox or isinstance(data, BBox):
         return data
     arr = np.asarray(data, float)
     return np.ndarray.__new__(BBox, shape=arr.shape, dtype=arr.dtype, buffer=arr)
@@ -227,7 +291,21 @@ def fromPoints(Points):
     """
     Points = np.asarray(Points, float).reshape(-1,2)
 
-    arr = np.vstack( (Points.min(0), Points.max(0)) )
+    arr = np.empty((2,2), float)
+    if len(Points) < 64:
+        # reduce straight into the rows of the result, rather than building
+        # two temporaries and stacking them.
+        Points.min(0, out=arr[0])
+        Points.max(0, out=arr[1])
+    else:
+        # numpy vectorizes a reduction along one long column far better than
+        # min(0) across only two of them, which more than pays for the
+        # extra calls once there are more than a few points.
+        X, Y = Points[:,0], Points[:,1]
+        arr[0,0] = X.min()
+        arr[0,1] = Y.min()
+        arr[1,0] = X.max()
+        arr[1,1] = Y.max()
     return np.ndarray.__new__(BBox, shape=arr.shape, dtype=arr.dtype, buffer=arr)
 
 def fromBBArray(BBarray):
@@ -243,8 +321,14 @@ def fromBBArray(BBarray):
 
  #   BBarray = N.asarray(BBarray, float).reshape(-1,2)
  #   arr = N.vstack( (BBarray.min(0), BBarray.max(0)) )
-    BBarray = np.asarray(BBarray, float).reshape(-1,2,2)
-    arr = np.vstack( (BBarray[:,0,:].min(0), BBarray[:,1,:].max(0)) )
+    # Reduce each of the four columns on its own: numpy vectorizes a
+    # reduction along one long axis far better than min(0) over a narrow one.
+    MinX, MinY, MaxX, MaxY = np.asarray(BBarray, float).reshape(-1,4).T
+    arr = np.empty((2,2), float)
+    arr[0,0] = MinX.min()
+    arr[0,1] = MinY.min()
+    arr[1,0] = MaxX.max()
+    arr[1,1] = MaxY.max()
     return asBBox(arr)
     #return asBBox( (upperleft, lowerright) ) * 2
 
@@ -272,6 +356,94 @@ def InfBBox():
     arr = np.array(((-np.inf, -np.inf),(np.inf, np.inf)), float)
     return np.ndarray.__new__(BBox, shape=arr.shape, dtype=arr.dtype, buffer=arr)
 
+def _hilbertIndex(Points, Order=16):
+    """
+    Returns the distance along a Hilbert curve of each of the Points (an NX2
+    array), after scaling them onto a 2**Order x 2**Order grid.
+
+    Points that are close to each other tend to be close along the curve, too.
+    """
+    Points = np.nan_to_num(np.asarray(Points, float), posinf=0.0, neginf=0.0)
+    Size = 2**Order
+    if len(Points):
+        Min = Points.min(0)
+        Scale = (Size - 1) / np.maximum(Points.max(0) - Min, 1e-300)
+        Points = (Points - Min) * Scale
+    x = Points[:,0].astype(np.int64)
+    y = Points[:,1].astype(np.int64)
+    d = np.zeros(len(Points), np.int64)
+    s = Size // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant, so the curve stays continuous
+        Flip = rx & ~ry
+        x = np.where(Flip, Size - 1 - x, x)
+        y = np.where(Flip, Size - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s //= 2
+    return d
+
+class BBoxIndex(object):
+    """
+    A static spatial index of a set of Bounding Boxes, for quickly finding
+    the ones that overlap a given Bounding Box.
+
+    The boxes are sorted along a Hilbert curve through their centers, so boxes
+    that are near each other end up next to each other, and then packed
+    bottom-up into a tree where each node covers NodeSize nodes of the level
+    below (a packed Hilbert R-tree.) A query only has to test the children of
+    the nodes that overlap it, instead of every box.
+
+    BBarray is in the shape: (Nx2x2), as for fromBBArray.
+
+    """
+    def __init__(self, BBarray, NodeSize=16):
+        if NodeSize < 2:
+            raise ValueError("NodeSize must be at least 2")
+        Boxes = np.asarray(BBarray, float).reshape(-1,4)
+        self.NodeSize = NodeSize
+
+        # NullBBoxes and InfBBoxes have no finite center, they all get the
+        # first key on the curve
+        with np.errstate(invalid='ignore'):
+            Centers = (Boxes[:,:2] + Boxes[:,2:]) / 2.0
+        Finite = np.isfinite(Centers).all(1)
+        Keys = np.zeros(len(Centers), np.int64)
+        Keys[Finite] = _hilbertIndex(Centers[Finite])
+        self.Order = np.argsort(Keys, kind='stable')
+        Level = Boxes[self.Order]
+        self.Levels = [Level]
+        while len(Level) > NodeSize:
+            Starts = np.arange(0, len(Level), NodeSize)
+            # fmin/fmax skip the NaNs of any NullBBoxes
+            Level = np.column_stack( (np.fmin.reduceat(Level[:,0], Starts),
+                                      np.fmin.reduceat(Level[:,1], Starts),
+                                      np.fmax.reduceat(Level[:,2], Starts),
+                                      np.fmax.reduceat(Level[:,3], Starts)) )
+            self.Levels.append(Level)
+
+    def __len__(self):
+        return len(self.Order)
+
+    def Query(self, BB):
+        """
+        Query(BB):
+
+        Returns an array of the indices of the Bounding Boxes that overlap
+        with BB, in increasing order. These are the same boxes that
+        BB.OverlapsMany(BBarray) would find.
+        """
+        BB = asBBox(BB)
+        Nodes = np.arange(len(self.Levels[-1]))
+        for i in range(len(self.Levels) - 1, -1, -1):
+            Nodes = Nodes[BB.OverlapsMany(self.Levels[i][Nodes])]
+            if i:
+                Nodes = (Nodes[:,None] * self.NodeSize + np.arange(self.NodeSize)).ravel()
+                Nodes = Nodes[Nodes < len(self.Levels[i-1])]
+        return np.sort(self.Order[Nodes])
+
 class RectBBox(BBox):
     """
     subclass of a BBox that can be used for a rotated Rectangle
@@ -1,3 +1,4 @@
+# cython: language_level=3, embedsignature=True, boundscheck=False, wraparound=False
 #----------------------------------------------------------------------
 # Name:        wx.svg._nanosvg.pyx
 # Purpose:     Cython-based wrappers for the nanosvg C code. See